@@ -0,0 +1,30 @@
+"""Added execution pagination indexes
+
+Revision ID: 7d2f4b9e1a63
+Revises: c14027f3c18b
+Create Date: 2025-07-14 10:42:18.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2f4b9e1a63'
+down_revision: Union[str, None] = 'c14027f3c18b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_athena_query_executions_user_created', 'athena_query_executions', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_athena_query_executions_query_created', 'athena_query_executions', ['query_id', 'user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_athena_query_executions_query_created', table_name='athena_query_executions')
+    op.drop_index('ix_athena_query_executions_user_created', table_name='athena_query_executions')
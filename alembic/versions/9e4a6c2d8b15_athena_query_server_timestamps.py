@@ -0,0 +1,30 @@
+"""Athena query server side timestamps
+
+Revision ID: 9e4a6c2d8b15
+Revises: 7d2f4b9e1a63
+Create Date: 2025-07-15 09:12:40.318522
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4a6c2d8b15'
+down_revision: Union[str, None] = '7d2f4b9e1a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in ('created_at', 'updated_at', 'deleted_at'):
+        op.alter_column('athena_queries', column, server_default=sa.func.now())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in ('created_at', 'updated_at', 'deleted_at'):
+        op.alter_column('athena_queries', column, server_default=None)
@@ -0,0 +1,33 @@
+"""Resource owner summary index
+
+Revision ID: 3b7e1c9d4f20
+Revises: e733d161a2c5
+Create Date: 2025-07-02 11:12:45.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e1c9d4f20'
+down_revision: Union[str, None] = 'e733d161a2c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_resource_owner_resource_status_owner',
+        'resource_owner',
+        ['resource_id', 'status', 'owner_email'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_resource_owner_resource_status_owner', table_name='resource_owner')
@@ -1,5 +1,12 @@
-import sqlglot
-from sqlglot.expressions import Select, Column
+from functools import lru_cache
+
+from sqlglot.dialects.dialect import Dialect
+from sqlglot.expressions import Select, Column, Expression
+
+# Built once, parse_one would create a new dialect, tokenizer and parser per call
+_DIALECT = Dialect.get_or_raise(None)
+_TOKENIZER = _DIALECT.tokenizer()
+_PARSER = _DIALECT.parser()
 
 
 # query = (
@@ -63,25 +70,31 @@ Select sum(line_item_unblended_cost) AS sum_line_item_unblended_cost,month(bill_
 """
 
 
+@lru_cache(maxsize=1024)
+def parse_sql(sql: str) -> Expression:
+    return _PARSER.parse(_TOKENIZER.tokenize(sql), sql)[0]
+
+
 def get_top_level_select_columns(sql: str):
+    return list(_get_top_level_select_columns(sql))
+
+
+@lru_cache(maxsize=1024)
+def _get_top_level_select_columns(sql: str) -> tuple[str, ...]:
     # Parse the query
-    parsed = sqlglot.parse_one(sql)
-
-    # Find only the top-level SELECT (ignore subqueries)
-    top_level_select = parsed.find(Select)
-
-    # Extract column aliases or names
-    columns = []
-    for expr in top_level_select.expressions:
-        alias = expr.alias
-        print(f"{expr=}")
-        if alias:
-            columns.append(alias)
-        elif isinstance(expr, Column):
-            columns.append(expr.name)
-        # else:
-        #     columns.append(expr.sql())  # what will
-    return columns
+    parsed = parse_sql(sql)
+
+    # Find only the top-level SELECT (ignore subqueries), the root itself in most cases
+    top_level_select = (
+        parsed if isinstance(parsed, Select) else parsed.find(Select, bfs=False)
+    )
+
+    # Extract column aliases or names, unaliased expressions are skipped
+    return tuple(
+        alias or expr.name
+        for expr in top_level_select.expressions
+        if (alias := expr.alias) or isinstance(expr, Column)
+    )
 
 
 print(get_top_level_select_columns(query))
@@ -5,6 +5,7 @@ import os
 import base64
 import hmac
 import hashlib
+from functools import lru_cache
 from botocore.exceptions import ClientError
 
 app = FastAPI(title="Cognito Auth API with Email & TOTP MFA")
@@ -22,12 +23,17 @@ cognito_client = boto3.client(
 )
 
 
+@lru_cache
+def _hmac_template(client_secret):
+    # The keyed state only depends on the secret, copies skip the key schedule
+    return hmac.new(bytes(client_secret, "utf-8"), digestmod=hashlib.sha256)
+
+
+@lru_cache(maxsize=4096)
 def get_secret_hash(username, client_id, client_secret):
-    message = bytes(username + client_id, "utf-8")
-    key = bytes(client_secret, "utf-8")
-    return base64.b64encode(
-        hmac.new(key, message, digestmod=hashlib.sha256).digest()
-    ).decode()
+    h = _hmac_template(client_secret).copy()
+    h.update(bytes(username + client_id, "utf-8"))
+    return base64.b64encode(h.digest()).decode()
 
 
 # --- Pydantic Models ---
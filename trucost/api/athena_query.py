@@ -1,7 +1,10 @@
-import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
 from typing import Annotated, List
 
-from fastapi import APIRouter, HTTPException, Depends, UploadFile
+from fastapi import APIRouter, HTTPException, Depends, Request, UploadFile
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from sqlalchemy.exc import SQLAlchemyError
 
 from trucost.api.auth import get_current_user
@@ -16,23 +19,60 @@ from trucost.core.models.athena_query import (
     AthenaQueryResponse,
     AthenaQueryPagination,
 )
-from trucost.core.models.common.pagination import PaginationMetadata
+from trucost.core.models.common.pagination import build_pagination
 from trucost.core.models.user import User
-from trucost.core.injector import get_services
+from trucost.core.injector import get_process_pool, get_services
 from trucost.core.settings import Metaservices
 from trucost.utilities.read_queries import parse_csv_file, parse_excel_file
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/query", tags=["Queries"])
 
+# Built once, the list bodies are validated straight from the raw JSON bytes
+_create_queries_adapter = TypeAdapter(List[AthenaQueryCreate])
+_update_queries_adapter = TypeAdapter(List[AthenaQueryUpdate])
+
+
+def _list_body_openapi(model: type[BaseModel]) -> dict:
+    """Documents a `List[model]` JSON body that is read from the request directly"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": model.model_json_schema()}
+                }
+            },
+        }
+    }
+
+
+async def _validate_body(request: Request, adapter: TypeAdapter):
+    try:
+        return adapter.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(
+            [
+                {**error, "loc": ("body", *error["loc"])}
+                for error in e.errors(include_url=False)
+            ]
+        )
+
 
-@router.post("/", response_model=List[AthenaQueryResponse])
+@router.post(
+    "/",
+    response_model=List[AthenaQueryResponse],
+    openapi_extra=_list_body_openapi(AthenaQueryCreate),
+)
 async def create_queries(
-    queries: List[AthenaQueryCreate],
+    request: Request,
     user: Annotated[User, Depends(get_current_user)],
     services: Annotated[Metaservices, Depends(get_services)],
 ):
     """Create queries from JSON input"""
+    queries = await _validate_body(request, _create_queries_adapter)
+
     async with services.db.get_session() as session:
         try:
             return await services.athena_query_repo.create(session, queries)
@@ -46,6 +86,7 @@ async def create_queries(
 async def upload_queries(
     # user: Annotated[User, Depends(get_current_user)],
     services: Annotated[Metaservices, Depends(get_services)],
+    process_pool: Annotated[ProcessPoolExecutor, Depends(get_process_pool)],
     csv_file: UploadFile | None = None,
     excel_file: UploadFile | None = None,
     sheet_name: str | None = None,
@@ -53,9 +94,9 @@ async def upload_queries(
     """Create queries from CSV file upload"""
     queries = []
     if csv_file is not None:
-        queries = await parse_csv_file(csv_file)
+        queries = parse_csv_file(csv_file)
     elif excel_file is not None:
-        queries = await asyncio.to_thread(parse_excel_file, excel_file, sheet_name)
+        queries = await parse_excel_file(excel_file, process_pool, sheet_name)
 
     async with services.db.get_session() as session:
         try:
@@ -79,19 +120,25 @@ async def get_query(
     return query
 
 
-@router.put("/", response_model=List[AthenaQueryResponse])
+@router.put(
+    "/",
+    response_model=List[AthenaQueryResponse],
+    openapi_extra=_list_body_openapi(AthenaQueryUpdate),
+)
 async def update_queries(
-    queries: List[AthenaQueryUpdate],
+    request: Request,
     user: Annotated[User, Depends(get_current_user)],
     services: Annotated[Metaservices, Depends(get_services)],
 ):
+    queries = await _validate_body(request, _update_queries_adapter)
+
     async with services.db.get_session() as session:
         try:
             return await services.athena_query_repo.update(session, queries)
         except QueryNotFoundError as e:
             raise HTTPException(status_code=404, detail=str(e))
-        except SQLAlchemyError as e:
-            print(e)
+        except SQLAlchemyError:
+            logger.exception("Failed to update queries")
             raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
@@ -110,13 +157,19 @@ async def delete_query(
             raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
-@router.get("/", response_model=AthenaQueryPagination)
+# The page is already built as an `AthenaQueryPagination`, `response_model=None` skips
+# the dump and revalidation against the same model, `responses` keeps it documented
+@router.get(
+    "/",
+    response_model=None,
+    responses={200: {"model": AthenaQueryPagination}},
+)
 async def list_queries(
     user: Annotated[User, Depends(get_current_user)],
     services: Annotated[Metaservices, Depends(get_services)],
     page: int = 1,
     page_size: int = 10,
-):
+) -> AthenaQueryPagination:
     """List athena queries with pagination"""
 
     # Calculate offset from page number
@@ -127,19 +180,7 @@ async def list_queries(
             session, offset, page_size
         )
 
-        # Calculate pagination metadata
-        total_pages = (total + page_size - 1) // page_size
-        next_page = page + 1 if page < total_pages else None
-        prev_page = page - 1 if page > 1 else None
-
         return AthenaQueryPagination(
             data=result,
-            pagination=PaginationMetadata(
-                total=total,
-                page=page,
-                page_size=page_size,
-                total_pages=total_pages,
-                next_page=next_page,
-                prev_page=prev_page,
-            ),
+            pagination=build_pagination(total, page, page_size),
         )
@@ -1,9 +1,19 @@
-from typing import Annotated
+import asyncio
+import logging
+import os
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Annotated, Mapping
 import jwt
 import uuid
 
+from cachetools import TTLCache
+
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
 
 from trucost.core.models.user import (
     User,
@@ -17,62 +27,130 @@ from trucost.core.models.user import (
     MFAChallenge,
 )
 
-from trucost.core.models.common.pagination import PaginationMetadata
+from trucost.core.models.common.pagination import build_pagination
 from trucost.core.injector import get_services, get_oauth_scheme, get_settings
+from trucost.core.services.db import domain_from_email
 from trucost.core.settings import Metaservices, MetaSettings
 
+logger = logging.getLogger(__name__)
+
 auth_router = APIRouter(prefix="/auth", tags=["Auth"])
 
+# token -> (user columns, exp), lets repeated requests with the same token skip
+# the signature check and the user lookup. Only a read-only copy of the columns is
+# cached, each request gets its own `User` built from it
+_current_user_cache = TTLCache(maxsize=10_000, ttl=60)
+
+_USER_COLUMNS = tuple(attr.key for attr in inspect(User).column_attrs)
+
+
+def _user_from_columns(columns: Mapping) -> User:
+    """A detached `User` of the request, adding it to a session never inserts it again"""
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return user
+
+
+def _cognito_issuer(region_name: str, user_pool_id: str) -> str:
+    return f"https://cognito-idp.{region_name}.amazonaws.com/{user_pool_id}"
+
+
+@lru_cache
+def _get_jwks_client(region_name: str, user_pool_id: str) -> jwt.PyJWKClient:
+    """One JWKS client per user pool, signing keys are cached by `kid`"""
+    return jwt.PyJWKClient(
+        f"{_cognito_issuer(region_name, user_pool_id)}/.well-known/jwks.json",
+        cache_keys=True,
+        lifespan=60 * 60,  # 1 hour
+    )
+
+
+@lru_cache(maxsize=32)
+def _get_signing_key(region_name: str, user_pool_id: str, kid: str):
+    """Parsed public key for a token `kid`, fetched once from the pool JWKS"""
+    return _get_jwks_client(region_name, user_pool_id).get_signing_key(kid).key
+
+
+@lru_cache
+def _get_jwt_decode_kwargs(region_name: str, user_pool_id: str, client_id: str) -> dict:
+    """`jwt.decode` options, they only depend on the settings"""
+    return {
+        "algorithms": ["RS256"],
+        "audience": client_id,
+        "issuer": _cognito_issuer(region_name, user_pool_id),
+        "options": {"require": ["exp", "iat"]},
+    }
+
 
-def domain_from_email(email: str) -> str:
-    domain = email.split("@")[1].strip().lower()
-    if not domain:
-        raise ValueError(f"Invalid domain: {domain=}")
-    return domain
+def _uuid4_pair() -> tuple[uuid.UUID, uuid.UUID]:
+    """Two random uuids from a single urandom read"""
+    entropy = os.urandom(32)
+    return (
+        uuid.UUID(bytes=entropy[:16], version=4),
+        uuid.UUID(bytes=entropy[16:], version=4),
+    )
+
+
+async def _authenticate_token(
+    token: str,
+    services: Metaservices,
+    settings: MetaSettings,
+) -> User:
+    """Verify the cognito token and return the matching user"""
+    cached = _current_user_cache.get(token)
+    if cached and cached[1] > time.time():
+        return _user_from_columns(cached[0])
+
+    # Only the header is needed to pick the key, the payload is decoded once
+    # below while verifying
+    kid = jwt.get_unverified_header(token).get("kid")
+    if not kid:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    signing_key = _get_signing_key(
+        settings.aws_region_name, settings.cognito_user_pool_id, kid
+    )
+
+    payload: dict = jwt.decode(
+        token,
+        signing_key,
+        **_get_jwt_decode_kwargs(
+            settings.aws_region_name,
+            settings.cognito_user_pool_id,
+            settings.cognito_client_id,
+        ),
+    )
+    email = payload.get("email")
+    if not email:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    async with services.db.get_session() as db_session:
+        user = await services.user_repo.get_by_email(db_session, email)
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid token")
+
+    _current_user_cache[token] = (
+        MappingProxyType({key: getattr(user, key) for key in _USER_COLUMNS}),
+        payload["exp"],
+    )
+    return user
 
 
 async def get_current_user(
     token: Annotated[str, Depends(get_oauth_scheme)],
     services: Annotated[Metaservices, Depends(get_services)],
     settings: Annotated[MetaSettings, Depends(get_settings)],
-    fetch_account_id: bool = True,
 ):
     try:
-        jwks_url = f"https://cognito-idp.{settings.aws_region_name}.amazonaws.com/{settings.cognito_user_pool_id}/.well-known/jwks.json"
-
-        jwks_client = jwt.PyJWKClient(jwks_url)
+        user = await _authenticate_token(token, services, settings)
 
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
-        if not signing_key:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        payload: dict = jwt.decode(
-            token,
-            signing_key.key,  # This is a PEM-formatted key
-            algorithms=["RS256"],
-            audience=settings.cognito_client_id,
-            issuer=f"https://cognito-idp.{settings.aws_region_name}.amazonaws.com/{settings.cognito_user_pool_id}",
+        user.account_id = await services.dynamo_db.get_account_id_by_domain(
+            settings.dynamo_db_table_name, domain_from_email(user.email)
         )
-        email = payload.get("email")
-        if not email:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        async with services.db.get_session() as db_session:
-            user = await services.user_repo.get_by_email(db_session, email)
-            if not user:
-                raise HTTPException(status_code=401, detail="Invalid token")
-
-        if fetch_account_id:
-            user.account_id = await services.dynamo_db.get_account_id_by_domain(
-                settings.dynamo_db_table_name, domain_from_email(email)
-            )
         return user
 
     except Exception:
-        import traceback
-
-        print(f"Error: {traceback.format_exc()}")
-
+        logger.exception("Failed to authenticate user")
         raise HTTPException(status_code=401, detail="Invalid token")
 
 
@@ -107,8 +185,9 @@ async def register(
                 detail="Please contact support. User already exists.",
             )
 
-        user_name = str(uuid.uuid4())
-        hashed_password = services.jwt_auth.get_password_hash(str(uuid.uuid4()))
+        user_uuid, password_uuid = _uuid4_pair()
+        user_name = str(user_uuid)
+        hashed_password = services.jwt_auth.get_password_hash(str(password_uuid))
 
         try:
             await services.cognito.sign_up(
@@ -119,7 +198,7 @@ async def register(
                 user.phone_number,
             )
         except Exception as e:
-            print(f"Error signing up user {user.email}: {e}")
+            logger.exception("Error signing up user %s", user.email)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Error signing up user: {e}",
@@ -148,8 +227,9 @@ async def confirm_register(
     settings: Annotated[MetaSettings, Depends(get_settings)],
 ):
     async with services.db.get_session() as db_session:
-        user = await services.user_repo.get_by_email(
-            db_session, user_confirmation.email
+        user, cognito_user = await asyncio.gather(
+            services.user_repo.get_by_email(db_session, user_confirmation.email),
+            services.cognito.admin_get_user(user_confirmation.email),
         )
 
         if not user:
@@ -158,39 +238,46 @@ async def confirm_register(
                 detail="Please contact support. User not found.",
             )
 
-        cognito_user = await services.cognito.admin_get_user(user.email)
         if not cognito_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Please contact support. Cognito user not found.",
             )
 
+        # The account id only depends on the email, look it up while cognito
+        # confirms the code
+        account_id_task = asyncio.create_task(
+            services.dynamo_db.get_account_id_by_domain(
+                settings.dynamo_db_table_name, domain_from_email(user.email)
+            )
+        )
         try:
             await services.cognito.confirm_sign_up(
                 user.email,
                 user_confirmation.confirmation_code,
             )
-        except Exception as e:
-            print(f"Error confirming user {user.email}: {e}")
-            import traceback
-
-            print(traceback.format_exc())
+        except Exception:
+            account_id_task.cancel()
+            logger.exception("Error confirming user %s", user.email)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Failed to confirm user",
             )
 
-        user.account_id = await services.dynamo_db.get_account_id_by_domain(
-            settings.dynamo_db_table_name, domain_from_email(user.email)
-        )
+        user.account_id = await account_id_task
 
+        # Assign default dashboard to user, the summary db uses its own engine
+        # so it can be created at the same time
+        pending = [
+            services.global_settings_repo.add_dashboard_to_existing(
+                db_session, user.id, f"{user.account_id}_dashboard"
+            )
+        ]
         if user.account_id:
-            await services.summary_db_factory.create_db(settings, [user.account_id])
-
-            # Assign default dashboard to user
-        await services.global_settings_repo.add_dashboard_to_existing(
-            db_session, user.id, f"{user.account_id}_dashboard"
-        )
+            pending.append(
+                services.summary_db_factory.create_db(settings, [user.account_id])
+            )
+        await asyncio.gather(*pending)
 
         # try:
         #     await services.template_repo.create_template(
@@ -246,7 +333,12 @@ async def login(
             user.hashed_password,
         )
 
-        print(f"Response: {response}")
+        # The response carries the tokens, only the challenge is logged
+        logger.debug(
+            "Login for %s returned challenge %s",
+            user.email,
+            response.get("ChallengeName"),
+        )
 
         return response
     except Exception as e:
@@ -296,20 +388,9 @@ async def get_users(
             limit=page_size,
         )
 
-        total_pages = (total + page_size - 1) // page_size
-        next_page = page + 1 if page < total_pages else None
-        previous_page = page - 1 if page > 1 else None
-
         return UserListResponse(
             data=users,
-            pagination=PaginationMetadata(
-                total=total,
-                page=page,
-                page_size=page_size,
-                total_pages=total_pages,
-                next_page=next_page,
-                previous_page=previous_page,
-            ),
+            pagination=build_pagination(total, page, page_size),
         )
 
 
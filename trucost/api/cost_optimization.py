@@ -1,30 +1,60 @@
+import asyncio
+import logging
+from collections import defaultdict
+from html import escape
 from typing import Annotated, List, Dict
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import or_, and_
+import orjson
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.exc import SQLAlchemyError
 
 from trucost.api.auth import get_current_user
 from trucost.core.models.cost_optimization import (
     CostOptimizationPagination,
-    GroupByConfig,
     FilterFacetsFilter,
     ErrorResponse,
     CostOptimizationNotificationPayload,
     CostOptimizeWithResourceOwner,
     CostOptimizationFilterWithIds,
 )
-from trucost.core.models.resource_owner import ResourceOwner, ResourceOwnerStatus
 from trucost.core.models.user import User
 from trucost.core.injector import get_services, get_settings
 from trucost.core.settings import Metaservices, MetaSettings
-from trucost.core.models.common.pagination import PaginationMetadata
+from trucost.core.models.common.pagination import (
+    PaginationMetadata,
+    build_pagination,
+)
+
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/cost-optimization", tags=["Cost Optimization"])
 
+# Owner notification emails sent at the same time
+_EMAIL_SEND_CONCURRENCY = 10
+# Resources listed in a single notification email, larger buckets are split over emails
+_EMAIL_RESOURCES_LIMIT = 100
+
+# (account id, filters) -> encoded facets, the recommendations only change on the periodic
+# loads and the owner facets are cleared on owner changes. Hits are served as-is without
+# opening a session or serializing again
+_filter_facets_cache = TTLCache(maxsize=1_000, ttl=5 * 60)
+
+# (account id, filters and ids) -> savings summary. Paging through a filtered list
+# repeats the same summary on every page, it is aggregated once and cleared on owner
+# changes since the savings are split by the owner status
+_cost_summary_cache = TTLCache(maxsize=1_000, ttl=60)
+
+
+def clear_cost_summaries(account_id: str):
+    """Drop the account's cached summaries and facets, they depend on the resource owners"""
+    for cache in (_cost_summary_cache, _filter_facets_cache):
+        for key in [key for key in cache if key[0] == account_id]:
+            cache.pop(key, None)
+
 
-@router.post("/")
+@router.post("/", responses={200: {"model": CostOptimizationPagination}})
 async def get_all_cost_data(
     user: Annotated[User, Depends(get_current_user)],
     payload: CostOptimizationFilterWithIds,
@@ -37,103 +67,56 @@ async def get_all_cost_data(
     try:
         offset = (page - 1) * page_size
 
-        async with services.summary_db_factory.get_session(
-            user.account_id, settings, services
-        ) as session:
-            result, total = await services.cost_optimization_repo.get_all_cost_data(
-                session,
-                payload.filters,
-                offset,
-                page_size,
-                payload.sort,
-                payload.ids,
-            )
-
-            end_filters = [
-                and_(
-                    or_(
-                        ResourceOwner.status != ResourceOwnerStatus.SUPRESSED,
-                        ResourceOwner.status.is_(None),
-                    ),
-                    or_(
-                        ResourceOwner.status != ResourceOwnerStatus.COMPLETED,
-                        ResourceOwner.status.is_(None),
-                    ),
-                ),
-            ]
-
-            print("payload.ids", payload.ids)
-            print("result", result)
-            print("total", total)
-
-            if payload.ids:
-                end_filters.append(ResourceOwner.id.in_(payload.ids))
-
-            total_potential_savings = (
-                await services.cost_optimization_repo.get_aggregated_cost_data(
+        # An AsyncSession runs one statement at a time, so the page and the summary
+        # each get their own session to run concurrently
+        async def fetch_page():
+            async with services.summary_db_factory.get_session(
+                user.account_id, settings, services
+            ) as session:
+                return await services.cost_optimization_repo.get_all_cost_data(
                     session,
                     payload.filters,
-                    GroupByConfig(
-                        fields=[],
-                        aggregations={"unblended_cost": "sum"},
-                    ),
-                    end_filters=end_filters,
+                    offset,
+                    page_size,
+                    payload.sort,
+                    payload.ids,
                 )
-            )
 
-            end_filters = [
-                and_(
-                    or_(
-                        ResourceOwner.status != ResourceOwnerStatus.SUPRESSED,
-                        ResourceOwner.status.is_(None),
-                    ),
-                    ResourceOwner.status == ResourceOwnerStatus.COMPLETED,
-                )
-            ]
-
-            if payload.ids:
-                end_filters.append(ResourceOwner.id.in_(payload.ids))
-
-            total_achieved_savings = (
-                await services.cost_optimization_repo.get_aggregated_cost_data(
-                    session,
-                    payload.filters,
-                    GroupByConfig(
-                        fields=[],
-                        aggregations={"unblended_cost": "sum"},
-                    ),
-                    end_filters=end_filters,
-                )
+        async def fetch_summary():
+            cache_key = (
+                user.account_id,
+                payload.model_dump_json(include={"filters", "ids"}),
             )
+            cost_summary = _cost_summary_cache.get(cache_key)
+            if cost_summary is None:
+                async with services.summary_db_factory.get_session(
+                    user.account_id, settings, services
+                ) as session:
+                    cost_summary = (
+                        await services.cost_optimization_repo.get_cost_summary(
+                            session, payload.filters, payload.ids
+                        )
+                    )
+                _cost_summary_cache[cache_key] = cost_summary
+            return cost_summary
+
+        (result, total), cost_summary = await asyncio.gather(
+            fetch_page(), fetch_summary()
+        )
 
-            # Calculate pagination metadata
-            total_pages = (total + page_size - 1) // page_size
-            next_page = page + 1 if page < total_pages else None
-            prev_page = page - 1 if page > 1 else None
+        logger.debug(
+            "Cost data for ids %s: %s rows of %s", payload.ids, len(result), total
+        )
 
-            return CostOptimizationPagination(
-                data=result,
-                cost_summary={
-                    "total_potential_savings": total_potential_savings[0][
-                        "unblended_cost_sum"
-                    ]
-                    if total_potential_savings
-                    else 0,
-                    "total_achieved_savings": total_achieved_savings[0][
-                        "unblended_cost_sum"
-                    ]
-                    if total_achieved_savings
-                    else 0,
-                },
-                pagination=PaginationMetadata(
-                    total=total,
-                    page=page,
-                    page_size=page_size,
-                    total_pages=total_pages,
-                    next_page=next_page,
-                    prev_page=prev_page,
-                ),
-            )
+        page_data = CostOptimizationPagination(
+            data=[CostOptimizeWithResourceOwner.from_row(row) for row in result],
+            cost_summary=cost_summary,
+            pagination=build_pagination(total, page, page_size),
+        )
+        # Serialized by pydantic-core directly, not walked again by jsonable_encoder
+        return Response(
+            content=page_data.model_dump_json(), media_type="application/json"
+        )
     except SQLAlchemyError as e:
         if '(1146, "Table' in e._message():
             return CostOptimizationPagination(
@@ -148,11 +131,7 @@ async def get_all_cost_data(
                 ),
             )
         else:
-            import traceback
-
-            print("Unknown error: >")
-            print(traceback.format_exc())
-            print("Unknown error: <")
+            logger.exception("Failed to get cost optimization data")
 
             return CostOptimizationPagination(
                 error=ErrorResponse(
@@ -175,17 +154,23 @@ async def get_filter_facets(
     services: Annotated[Metaservices, Depends(get_services)],
 ):
     """Get the unique values of each column for the filters"""
-    try:
-        async with services.summary_db_factory.get_session(
-            user.account_id, settings, services
-        ) as session:
-            result = await services.cost_optimization_repo.get_filter_facets(
-                session, filters.filters
-            )
+    cache_key = (user.account_id, filters.model_dump_json())
+    content = _filter_facets_cache.get(cache_key)
+    if content is None:
+        try:
+            async with services.summary_db_factory.get_session(
+                user.account_id, settings, services
+            ) as session:
+                result = await services.cost_optimization_repo.get_filter_facets(
+                    session, filters.filters
+                )
+        except SQLAlchemyError:
+            raise HTTPException(status_code=500, detail="Internal Server Error")
 
-            return result
-    except SQLAlchemyError:
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+        content = orjson.dumps(result)
+        _filter_facets_cache[cache_key] = content
+
+    return Response(content=content, media_type="application/json")
 
 
 @router.post("/notify-owners")
@@ -197,107 +182,116 @@ async def notify_owners(
 ):
     """Notify owners of cost optimization data"""
 
-    result = await get_all_cost_data(
-        payload=CostOptimizationFilterWithIds(
-            filters=payload.filters.filters,
-            sort=payload.filters.sort,
-            group_by=payload.filters.group_by,
-            ids=payload.ids,
-        ),
-        user=user,
-        settings=settings,
-        services=services,
-        page=1,  # Get first page
-        page_size=100,  # Get a reasonable batch size
-    )
+    # Send emails concurrently, capped to stay within the send rate
+    send_limit = asyncio.Semaphore(_EMAIL_SEND_CONCURRENCY)
+    sends: List[asyncio.Task] = []
+    sent_to: List[str] = []
+
+    async def send(email, resources, cost_summary):
+        async with send_limit:
+            return await send_cost_optimization_email(
+                email=email,
+                resources=resources,
+                cost_summary=cost_summary,
+                services=services,
+            )
+
+    # Rows are streamed and bucketed per recipient, an owner's bucket is sent as soon as
+    # it is full so only the buckets still filling up are held in memory
+    buckets: Dict[str, List[CostOptimizeWithResourceOwner]] = defaultdict(list)
+    savings_by_owner = {}
+    total_summary = {}
+
+    def flush(email):
+        resources = buckets.pop(email)
+        sent_to.append(email)
+        sends.append(
+            asyncio.create_task(send(email, resources, savings_by_owner.get(email, {})))
+        )
+
+    rows_count = 0
+    try:
+        async with services.summary_db_factory.get_session(
+            user.account_id, settings, services
+        ) as session:
+            # Savings are summed in SQL per owner, over all the rows matching the filters
+            savings_by_owner = (
+                await services.cost_optimization_repo.get_savings_by_owner(
+                    session, payload.filters.filters, payload.ids
+                )
+            )
+            total_summary = {
+                key: sum(savings[key] for savings in savings_by_owner.values())
+                for key in ("total_potential_savings", "total_achieved_savings")
+            }
+
+            async for row in services.cost_optimization_repo.iter_cost_data(
+                session, payload.filters.filters, payload.filters.sort, payload.ids
+            ):
+                rows_count += 1
+                # Built without validation like the list rows, the summary tables are typed
+                resource = CostOptimizeWithResourceOwner.from_row(row)
+
+                # If specific email is provided, send all data to that email in one
+                # email, otherwise group by owner email and send separate emails
+                email = payload.email or resource.owner_email
+                if not email:
+                    continue
+
+                buckets[email].append(resource)
+                if not payload.email and len(buckets[email]) >= _EMAIL_RESOURCES_LIMIT:
+                    flush(email)
+    except SQLAlchemyError as e:
+        await _cancel_sends(sends)
+
+        if '(1146, "Table' in e._message():
+            return {"message": "Error fetching data: Data does not exist"}
 
-    if result.error:
-        return {"message": f"Error fetching data: {result.error.error_message}"}
+        logger.exception("Failed to get cost optimization data")
+        return {"message": "Error fetching data: Internal Server Error"}
+    except BaseException:
+        # Any other failure, including the request being cancelled, must not leave the
+        # emails already queued sending in the background
+        await _cancel_sends(sends)
+        raise
 
-    if not result.data:
+    if not rows_count:
         return {"message": "No data to send"}
 
-    def calculate_group_savings(resources: List[CostOptimizeWithResourceOwner]):
-        """Calculate potential and achieved savings based on resource status."""
-        potential_savings = 0
-        achieved_savings = 0
-
-        for r in resources:
-            savings = r.unblended_cost or 0
-
-            # Skip if no savings potential
-            if savings <= 0:
-                continue
-
-            # Calculate based on status
-            if not r.status or r.status in ["TODO", "WIP"]:
-                # No status, TODO, or WIP count towards potential savings
-                potential_savings += savings
-            elif r.status == "COMPLETED":
-                # Completed resources count as achieved savings
-                achieved_savings += savings
-            elif r.status == "SUPRESSED":
-                # Suppressed resources are excluded from both calculations
-                continue
-
-        return {
-            "total_potential_savings": potential_savings,
-            "total_achieved_savings": achieved_savings,
-        }
-
-    # If specific email is provided, send all data to that email
     if payload.email:
-        group_summary = calculate_group_savings(result.data)
-
         return await send_cost_optimization_email(
             email=payload.email,
-            resources=result.data,
-            cost_summary=group_summary,
+            resources=buckets.pop(payload.email),
+            cost_summary=total_summary,
             services=services,
         )
 
-    # Otherwise, group by owner email and send separate emails
-    owner_groups: Dict[str, List[CostOptimizeWithResourceOwner]] = {}
-    for resource in result.data:
-        if not resource.owner_email:
-            continue
-        if resource.owner_email not in owner_groups:
-            owner_groups[resource.owner_email] = []
-        owner_groups[resource.owner_email].append(resource)
+    for email in list(buckets):
+        flush(email)
 
-    if not owner_groups:
+    if not sends:
         return {"message": "No owner emails found in the resources"}
 
-    # Send email to each owner group
+    results = await asyncio.gather(*sends, return_exceptions=True)
+
     responses = []
-    for owner_email, resources in owner_groups.items():
-        # Calculate status-based summaries for this group
-        group_summary = calculate_group_savings(resources)
-
-        response = await send_cost_optimization_email(
-            email=owner_email,
-            resources=resources,
-            cost_summary=group_summary,
-            services=services,
-        )
-        responses.append(response)
+    failed = []
+    for email, result in zip(sent_to, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to notify owner %s", email, exc_info=result)
+            failed.append(email)
+        else:
+            responses.append(result)
 
     return {
-        "message": f"Notifications sent to {len(responses)} owners",
+        "message": f"Notifications sent to {len({r['email'] for r in responses})} owners",
         "details": responses,
+        "failed": failed,
     }
 
 
-async def send_cost_optimization_email(
-    email: str,
-    resources: List[CostOptimizeWithResourceOwner],
-    cost_summary: dict,
-    services: Metaservices,
-):
-    """Helper function to send cost optimization email."""
-
-    html_body = (
-        """
+# Static parts of the notification email, only the summary and rows are built per send
+_EMAIL_HTML_HEAD = """
     <html>
     <head>
         <style>
@@ -333,14 +327,8 @@ async def send_cost_optimization_email(
         <h2>Cost Optimization Recommendations</h2>
         <p>Dear Resource Owner,</p>
     """
-        + f"""
-        <div class="summary">
-            <h3>Summary</h3>
-            <p>Total Potential Savings: ${cost_summary.get("total_potential_savings", 0):,.2f}</p>
-            <p>Total Achieved Savings: ${cost_summary.get("total_achieved_savings", 0):,.2f}</p>
-        </div>
-        
-        <p>Below are the detailed cost optimization recommendations for your resources:</p>
+
+_EMAIL_HTML_TABLE_HEAD = """        <p>Below are the detailed cost optimization recommendations for your resources:</p>
         <table>
             <tr>
                 <th>Resource ID</th>
@@ -353,24 +341,8 @@ async def send_cost_optimization_email(
                 <th>Achieved Savings ($)</th>
             </tr>
     """
-    )
-
-    # Add rows for each resource
-    for resource in resources:
-        html_body += f"""
-            <tr>
-                <td>{resource.resource_id}</td>
-                <td>{resource.product_code}</td>
-                <td>{resource.usage_account_name}</td>
-                <td>{resource.usage_account_id}</td>
-                <td>{resource.payer_account_name}</td>
-                <td>{resource.payer_account_id}</td>
-                <td class="money">${resource.potential_savings_usd:,.2f}</td>
-                <td class="money">${resource.achieved_savings_usd:,.2f}</td>
-            </tr>
-        """
 
-    html_body += """
+_EMAIL_HTML_TAIL = """
         </table>
         <p>Please review these recommendations and take appropriate action to optimize costs.</p>
         <p>Best regards,<br>Cost Optimization Team</p>
@@ -378,6 +350,54 @@ async def send_cost_optimization_email(
     </html>
     """
 
+
+async def _cancel_sends(sends: List[asyncio.Task]):
+    """Cancel the sends still running, their outcome is retrieved so none goes unobserved"""
+    for task in sends:
+        task.cancel()
+    await asyncio.gather(*sends, return_exceptions=True)
+
+
+async def send_cost_optimization_email(
+    email: str,
+    resources: List[CostOptimizeWithResourceOwner],
+    cost_summary: dict,
+    services: Metaservices,
+):
+    """Helper function to send cost optimization email."""
+
+    html_body = "".join(
+        (
+            _EMAIL_HTML_HEAD,
+            f"""
+        <div class="summary">
+            <h3>Summary</h3>
+            <p>Total Potential Savings: ${cost_summary.get("total_potential_savings", 0):,.2f}</p>
+            <p>Total Achieved Savings: ${cost_summary.get("total_achieved_savings", 0):,.2f}</p>
+        </div>
+        
+""",
+            _EMAIL_HTML_TABLE_HEAD,
+            # Add rows for each resource
+            *(
+                f"""
+            <tr>
+                <td>{escape(resource.resource_id)}</td>
+                <td>{escape(resource.product_code)}</td>
+                <td>{escape(resource.usage_account_name)}</td>
+                <td>{escape(resource.usage_account_id)}</td>
+                <td>{escape(resource.payer_account_name)}</td>
+                <td>{escape(resource.payer_account_id)}</td>
+                <td class="money">${resource.potential_savings_usd:,.2f}</td>
+                <td class="money">${resource.achieved_savings_usd:,.2f}</td>
+            </tr>
+        """
+                for resource in resources
+            ),
+            _EMAIL_HTML_TAIL,
+        )
+    )
+
     # Create plain text version
     plain_text = f"""
 Cost Optimization Recommendations
@@ -31,36 +31,38 @@ async def get_dashboard(
     user: Annotated[User, Depends(get_current_user)],
     services: Annotated[Metaservices, Depends(get_services)],
 ):
+    # Settings, templates and their queries are eager loaded by the repository, the
+    # batch is built from memory and the session is released before running it
     async with services.db.get_session() as session:
         user = await services.user_repo.get_settings_and_templates(session, user_id=2)
 
-        active_user_settings = None
-        for user_setting in user.user_settings:
-            if user_setting.active:
-                active_user_settings = user_setting
-                break
-
-        if active_user_settings is None:
-            raise HTTPException(status_code=400, detail="No active user settings found")
-
-        executions = await create_query_execution_batch_dashboard(
-            batch=AthenaQueryExecutionCreateBatchDashboard(
-                user_settings_id=active_user_settings.id,
-                queries=[
-                    QueryExecutionBatchDashboard(
-                        query_id=query.query_id,
-                        query_template_assignment_id=query.id,
-                        years=query.dashboard_config["dynamic_params"]["year"],
-                        months=query.dashboard_config["dynamic_params"]["month"],
-                    )
-                    for template in user.assigned_templates
-                    for query in template.queries_assigned
-                ],
-            ),
-            user=user,
-            services=services,
-        )
-        return executions
+    active_user_settings = None
+    for user_setting in user.user_settings:
+        if user_setting.active:
+            active_user_settings = user_setting
+            break
+
+    if active_user_settings is None:
+        raise HTTPException(status_code=400, detail="No active user settings found")
+
+    executions = await create_query_execution_batch_dashboard(
+        batch=AthenaQueryExecutionCreateBatchDashboard(
+            user_settings_id=active_user_settings.id,
+            queries=[
+                QueryExecutionBatchDashboard(
+                    query_id=query.query_id,
+                    query_template_assignment_id=query.id,
+                    years=query.dashboard_config["dynamic_params"]["year"],
+                    months=query.dashboard_config["dynamic_params"]["month"],
+                )
+                for template in user.assigned_templates
+                for query in template.queries_assigned
+            ],
+        ),
+        user=user,
+        services=services,
+    )
+    return executions
 
 
 @router.get("/assigned", response_model=list[UserDashboardResponse])
@@ -69,25 +71,17 @@ async def get_assigned_dashboards(
     services: Annotated[Metaservices, Depends(get_services)],
 ):
     async with services.db.get_session() as session:
-        user_dashboard_mapping = (
-            await services.global_settings_repo.get_global_settings(session)
+        dashboard_ids = await services.global_settings_repo.get_user_dashboard_ids(
+            session, user.id
         )
 
-        dashboards = []
-        for mapping in user_dashboard_mapping.user_role_dashboard_mapping:
-            if mapping.get("user_id") == user.id:
-                print(f"mapping: {mapping}")
-                dashboards.append(
-                    UserDashboardResponse(
-                        name=mapping.get("dashboard_id")
-                        .replace("-", " ")
-                        .replace("_", " ")
-                        .title(),
-                        dashboard_id=mapping.get("dashboard_id"),
-                    )
-                )
-
-        return dashboards
+        return [
+            UserDashboardResponse(
+                name=dashboard_id.replace("-", " ").replace("_", " ").title(),
+                dashboard_id=dashboard_id,
+            )
+            for dashboard_id in dashboard_ids
+        ]
 
 
 @router.get("/embedded-url/{dashboard_id}", response_model=DashboardEmbeddedUrlResponse)
@@ -99,24 +93,11 @@ async def get_dashboard_embed_url(
 ):
     """Get QuickSight dashboard embed URL for the specified dashboard ID"""
     async with services.db.get_session() as session:
-        # Get user with active settings
-        global_settings = await services.global_settings_repo.get_global_settings(
-            session
+        dashboard_ids = await services.global_settings_repo.get_user_dashboard_ids(
+            session, user.id
         )
 
-        if global_settings is None:
-            raise HTTPException(status_code=400, detail="No global settings found")
-
-        user_role_dashboard_mapping = global_settings.user_role_dashboard_mapping
-
-        found_dashboard_id = None
-        for mapping in user_role_dashboard_mapping:
-            if mapping.get("user_id") == user.id:
-                found_dashboard_id = mapping.get("dashboard_id")
-                if found_dashboard_id == dashboard_id:
-                    break
-
-        if not found_dashboard_id:
+        if dashboard_id not in dashboard_ids:
             raise HTTPException(
                 status_code=404, detail="No dashboard found for the user"
             )
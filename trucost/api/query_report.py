@@ -1,10 +1,18 @@
 import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from enum import Enum
-from typing import Annotated, List
+from hashlib import blake2b
+from typing import Annotated, Awaitable, Callable, List
 from uuid import uuid4
 
-from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
 
 from trucost.api.auth import get_current_user
 from trucost.core.models.query_report import (
@@ -16,21 +24,136 @@ from trucost.core.models.query_report import (
     AthenaQueryExecutionPagination,
     AthenaQueryExecutionCreateBatchDashboard,
 )
-from trucost.core.models.common.pagination import PaginationMetadata
+from trucost.core.models.common.pagination import (
+    build_pagination,
+    encode_cursor,
+    decode_cursor,
+)
 from trucost.core.models.user import User
 from trucost.core.models.query_report import QueryExecutionStatus
-from trucost.core.injector import get_services, get_settings
+from trucost.core.injector import get_process_pool, get_services, get_settings
 from trucost.core.settings import Metaservices, MetaSettings
-from trucost.utilities import result_to_excel
+from trucost.utilities import result_to_excel_path
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/executions", tags=["Executions"])
 
+# Started executions inserted together while the rest of a batch is still starting
+_EXECUTIONS_INSERT_CHUNK = 200
+
+# Athena results fetched at the same time for a batch export
+_GET_RESULTS_CONCURRENCY = 8
+
 
 class Format(str, Enum):
     excel = "excel"
     json = "json"
 
 
+async def _excel_response(
+    process_pool: ProcessPoolExecutor,
+    template_path: str,
+    sheet_to_result_map: dict,
+    filename: str,
+    headers: dict[str, str] | None = None,
+) -> FileResponse:
+    """Build the workbook in the process pool and send the file, it's removed once sent"""
+    # openpyxl is pure python and holds the GIL, workbooks are built in worker processes
+    # so a large export doesn't stall the event loop
+    path = await asyncio.get_running_loop().run_in_executor(
+        process_pool, result_to_excel_path, template_path, sheet_to_result_map
+    )
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            **(headers or {}),
+        },
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+def _result_etag(execution_id: str, format: Format) -> str:
+    """The results of a succeeded execution never change, they're tagged by id and format"""
+    digest = blake2b(f"{execution_id}:{format.value}".encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+async def _create_executions_as_started(
+    session: AsyncSession,
+    services: Metaservices,
+    f_executions: list[Awaitable[tuple[str, str]]],
+    build_execution: Callable[
+        [int, tuple[str, str] | Exception], AthenaQueryExecutionCreateWithUser
+    ],
+) -> list:
+    """
+    Record the executions as their queries are started instead of after the slowest one,
+    they're inserted `_EXECUTIONS_INSERT_CHUNK` at a time and returned in the order of
+    `f_executions`. `build_execution` gets the index and the (execution id, executed
+    query) or the exception of a start
+    """
+
+    async def start(i, f_execution):
+        try:
+            return i, await f_execution
+        except Exception as e:
+            return i, e
+
+    created = [None] * len(f_executions)
+    pending = []
+
+    async def flush():
+        rows = await services.query_report_repo.create_many(
+            session, [execution for _, execution in pending]
+        )
+        for (i, _), row in zip(pending, rows):
+            created[i] = row
+        pending.clear()
+
+    for f_start in asyncio.as_completed(
+        [start(i, f_execution) for i, f_execution in enumerate(f_executions)]
+    ):
+        i, execution = await f_start
+        pending.append((i, build_execution(i, execution)))
+        if len(pending) >= _EXECUTIONS_INSERT_CHUNK:
+            await flush()
+
+    if pending:
+        await flush()
+
+    return created
+
+
+async def _get_user_settings(
+    services: Metaservices, user_settings_id: int, user_id: int
+):
+    """Fetched on its own session, so it can run alongside lookups on the request's one"""
+    async with services.db.get_session() as session:
+        return await services.user_settings_repo.get_by_id(
+            session, user_settings_id, user_id
+        )
+
+
+def _decode_execution_cursor(cursor: str | None) -> tuple[datetime, int] | None:
+    """(created_at, id) of the last execution of the previous page"""
+    if not cursor:
+        return None
+    try:
+        created_at, id = decode_cursor(cursor)
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _next_execution_cursor(executions: list, page_size: int) -> str | None:
+    if len(executions) < page_size:
+        return None
+    return encode_cursor(executions[-1].created_at, executions[-1].id)
+
+
 @router.post("/", response_model=AthenaQueryExecutionResponse)
 async def create_query_execution(
     execution: AthenaQueryExecutionCreate,
@@ -40,19 +163,15 @@ async def create_query_execution(
     """Create a new query execution"""
     async with services.db.get_session() as session:
         try:
-            # Get the query
-            query = await services.athena_query_repo.get_by_id(
-                session, execution.query_id
+            # Get the query and the user settings
+            query, user_settings = await asyncio.gather(
+                services.athena_query_repo.get_by_id(session, execution.query_id),
+                _get_user_settings(services, execution.user_settings_id, user.id),
             )
 
             if query is None:
                 raise HTTPException(status_code=404, detail="Query not found")
 
-            # Get the user settings
-            user_settings = await services.user_settings_repo.get_by_id(
-                session, execution.user_settings_id, user.id
-            )
-
             if user_settings is None:
                 raise HTTPException(status_code=404, detail="User settings not found")
 
@@ -96,7 +215,9 @@ async def create_query_execution(
                     executed_query=executed_query,
                 ),
             )
-        except Exception:
+        except SQLAlchemyError:
+            # The 404 and 401 raised above go through to the client as they are
+            logger.exception("Failed to create query execution")
             raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
@@ -108,29 +229,27 @@ async def create_query_execution_batch(
 ):
     """Create a new query execution"""
     async with services.db.get_session() as session:
-        # Get the queries
+        # Get the queries and the user settings
         if batch.all_queries:
-            queries = await services.athena_query_repo.get_by_all(  # TODO: rename to get_by_category
+            f_queries = services.athena_query_repo.get_by_all(  # TODO: rename to get_by_category
                 session, batch.category
             )
         else:
-            queries = await services.athena_query_repo.get_by_ids(
-                session, batch.query_ids
-            )
+            f_queries = services.athena_query_repo.get_by_ids(session, batch.query_ids)
+
+        queries, user_settings = await asyncio.gather(
+            f_queries,
+            _get_user_settings(services, batch.user_settings_id, user.id),
+        )
 
-            found_queries = [query.id for query in queries]
-            missing_queries = set(batch.query_ids) - set(found_queries)
+        if not batch.all_queries:
+            missing_queries = set(batch.query_ids) - {query.id for query in queries}
 
             if missing_queries:
                 raise HTTPException(
                     status_code=404, detail=f"Queries not found: {missing_queries}"
                 )
 
-        # Get the user settings
-        user_settings = await services.user_settings_repo.get_by_id(
-            session, batch.user_settings_id, user.id
-        )
-
         if user_settings is None:
             raise HTTPException(status_code=404, detail="User settings not found")
 
@@ -157,36 +276,32 @@ async def create_query_execution_batch(
             )
             f_executions.append(f_execution)
 
-        # list of execution ids or exceptions
-        _executions = await asyncio.gather(*f_executions, return_exceptions=True)
-
-        executions = []
         batch_id = str(uuid4())
-        for execution, query in zip(_executions, queries):
+
+        def build_execution(i, execution):
+            query = queries[i]
             if isinstance(execution, Exception):
-                executions.append(
-                    AthenaQueryExecutionCreateWithUser(
-                        batch_id=batch_id,
-                        user_id=user.id,
-                        query_id=query.id,
-                        user_settings_id=batch.user_settings_id,
-                        execution_id=str(uuid4()),
-                        error_message=str(execution),
-                        executed_query="",
-                    )
-                )
-            else:
-                executions.append(
-                    AthenaQueryExecutionCreateWithUser(
-                        batch_id=batch_id,
-                        user_id=user.id,
-                        query_id=query.id,
-                        user_settings_id=batch.user_settings_id,
-                        execution_id=execution[0],
-                        executed_query=execution[1],
-                    )
+                return AthenaQueryExecutionCreateWithUser(
+                    batch_id=batch_id,
+                    user_id=user.id,
+                    query_id=query.id,
+                    user_settings_id=batch.user_settings_id,
+                    execution_id=str(uuid4()),
+                    error_message=str(execution),
+                    executed_query="",
                 )
-        return await services.query_report_repo.create_many(session, executions)
+            return AthenaQueryExecutionCreateWithUser(
+                batch_id=batch_id,
+                user_id=user.id,
+                query_id=query.id,
+                user_settings_id=batch.user_settings_id,
+                execution_id=execution[0],
+                executed_query=execution[1],
+            )
+
+        return await _create_executions_as_started(
+            session, services, f_executions, build_execution
+        )
 
 
 @router.post("/batch/dashboard", response_model=List[AthenaQueryExecutionResponse])
@@ -198,27 +313,25 @@ async def create_query_execution_batch_dashboard(
     """Create a new query execution"""
     async with services.db.get_session() as session:
         # Get the query ids
-        query_ids = set([query.query_id for query in batch.queries])
+        query_ids = {query.query_id for query in batch.queries}
 
-        # Get the queries
-        found_queries = await services.athena_query_repo.get_by_ids(
-            session, list(query_ids)
+        # Get the queries and the user settings
+        found_queries, user_settings = await asyncio.gather(
+            services.athena_query_repo.get_by_ids(session, list(query_ids)),
+            _get_user_settings(services, batch.user_settings_id, user.id),
         )
 
+        # id:query (actual sql query string)
+        found_query_map = {query.id: query.query for query in found_queries}
+
         # Check if the queries exist
-        found_query_ids = set([query.id for query in found_queries])
-        missing_query_ids = query_ids - found_query_ids
+        missing_query_ids = query_ids - found_query_map.keys()
 
         if missing_query_ids:
             raise HTTPException(
                 status_code=404, detail=f"Queries not found: {missing_query_ids}"
             )
 
-        # Get the user settings
-        user_settings = await services.user_settings_repo.get_by_id(
-            session, batch.user_settings_id, user.id
-        )
-
         if user_settings is None:
             raise HTTPException(status_code=404, detail="User settings not found")
 
@@ -233,9 +346,6 @@ async def create_query_execution_batch_dashboard(
                 detail="Failed to connect to AWS - please check your credentials",
             )
 
-        # id:query (actual sql query string)
-        found_query_map = {query.id: query.query for query in found_queries}
-
         # Execute the queries
         f_executions = []
         for query in batch.queries:
@@ -248,46 +358,43 @@ async def create_query_execution_batch_dashboard(
             )
             f_executions.append(f_execution)
 
-        # list of execution ids or exceptions
-        execution_results = await asyncio.gather(*f_executions, return_exceptions=True)
-
-        executions = []
         batch_id = str(uuid4())
-        for execution, query in zip(execution_results, batch.queries):
+
+        def build_execution(i, execution):
+            query = batch.queries[i]
             if isinstance(execution, Exception):
-                executions.append(
-                    AthenaQueryExecutionCreateWithUser(
-                        batch_id=batch_id,
-                        user_id=user.id,
-                        query_id=query.query_id,
-                        user_settings_id=batch.user_settings_id,
-                        execution_id=str(uuid4()),
-                        error_message=str(execution),
-                        executed_query="",
-                        query_template_assignment_id=query.query_template_assignment_id,
-                    )
-                )
-            else:
-                executions.append(
-                    AthenaQueryExecutionCreateWithUser(
-                        batch_id=batch_id,
-                        user_id=user.id,
-                        query_id=query.query_id,
-                        user_settings_id=batch.user_settings_id,
-                        execution_id=execution[0],
-                        executed_query=execution[1],
-                        query_template_assignment_id=query.query_template_assignment_id,
-                    )
+                return AthenaQueryExecutionCreateWithUser(
+                    batch_id=batch_id,
+                    user_id=user.id,
+                    query_id=query.query_id,
+                    user_settings_id=batch.user_settings_id,
+                    execution_id=str(uuid4()),
+                    error_message=str(execution),
+                    executed_query="",
+                    query_template_assignment_id=query.query_template_assignment_id,
                 )
-        return await services.query_report_repo.create_many(session, executions)
+            return AthenaQueryExecutionCreateWithUser(
+                batch_id=batch_id,
+                user_id=user.id,
+                query_id=query.query_id,
+                user_settings_id=batch.user_settings_id,
+                execution_id=execution[0],
+                executed_query=execution[1],
+                query_template_assignment_id=query.query_template_assignment_id,
+            )
 
+        return await _create_executions_as_started(
+            session, services, f_executions, build_execution
+        )
 
-@router.get("/batch/{batch_id}/result", response_class=StreamingResponse)
+
+@router.get("/batch/{batch_id}/result", response_class=FileResponse)
 async def get_batch_query_execution_result(
     batch_id: str,
     user: Annotated[User, Depends(get_current_user)],
     services: Annotated[Metaservices, Depends(get_services)],
     settings: Annotated[MetaSettings, Depends(get_settings)],
+    process_pool: Annotated[ProcessPoolExecutor, Depends(get_process_pool)],
 ):
     """Get the results of a query execution"""
 
@@ -300,19 +407,6 @@ async def get_batch_query_execution_result(
         if not executions:
             raise HTTPException(status_code=404, detail="Query execution not found")
 
-        if any(
-            execution.status
-            in [
-                QueryExecutionStatus.PENDING,
-                QueryExecutionStatus.RUNNING,
-            ]
-            for execution in executions
-        ):
-            raise HTTPException(
-                status_code=404,
-                detail="Some query executions are still pending or running",
-            )
-
         # Get the user settings, any of the executions will have the same user settings
         user_settings = await services.user_settings_repo.get_by_id(
             session, executions[0].user_settings_id, user.id
@@ -332,33 +426,70 @@ async def get_batch_query_execution_result(
                 detail="Failed to connect to AWS - please check your credentials",
             )
 
-        # Get the results of the query executions
+        # Refresh the executions not known to be done, 50 per status call instead of
+        # one call per execution
+        pending = [
+            execution
+            for execution in executions
+            if execution.status
+            in [
+                QueryExecutionStatus.PENDING,
+                QueryExecutionStatus.RUNNING,
+            ]
+        ]
+        if pending:
+            statuses = await athena_client.get_query_execution_statuses(
+                [execution.execution_id for execution in pending]
+            )
+            for execution in pending:
+                res = statuses.get(execution.execution_id)
+                if res and res["status"] in [
+                    QueryExecutionStatus.SUCCEEDED,
+                    QueryExecutionStatus.FAILED,
+                    QueryExecutionStatus.CANCELLED,
+                ]:
+                    execution.status = res["status"]
+                    execution.error_message = res["failure_reason"]
+            await session.commit()
+
+            if any(
+                execution.status
+                in [
+                    QueryExecutionStatus.PENDING,
+                    QueryExecutionStatus.RUNNING,
+                ]
+                for execution in pending
+            ):
+                raise HTTPException(
+                    status_code=404,
+                    detail="Some query executions are still pending or running",
+                )
+
+        # Get the results of the query executions, a few at a time so large batches
+        # neither exhaust the client's connection pool nor the worker threads
+        fetch_limit = asyncio.Semaphore(_GET_RESULTS_CONCURRENCY)
+
+        async def get_results(execution_id):
+            async with fetch_limit:
+                return await athena_client.get_query_results(execution_id)
+
         results = await asyncio.gather(
-            *[
-                athena_client.get_query_results(execution.execution_id)
-                for execution in executions
-            ],
+            *[get_results(execution.execution_id) for execution in executions],
             return_exceptions=True,
         )
 
-        sheet_to_result_map = dict(
-            zip(
-                [execution.query.query_subtype for execution in executions],
-                [
-                    result if not isinstance(result, Exception) else []
-                    for result in results
-                ],
-            )
-        )
-
-        excel_file = await asyncio.to_thread(
-            result_to_excel, settings.template_path, sheet_to_result_map
-        )
+        sheet_to_result_map = {
+            execution.query.query_subtype: result
+            if not isinstance(result, Exception)
+            else []
+            for execution, result in zip(executions, results)
+        }
 
-        return StreamingResponse(
-            iter([excel_file]),  # Wrap bytes in an iterator
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={batch_id}.xlsx"},
+        return await _excel_response(
+            process_pool,
+            settings.template_path,
+            sheet_to_result_map,
+            f"{batch_id}.xlsx",
         )
 
 
@@ -368,31 +499,30 @@ async def list_user_executions(
     services: Annotated[Metaservices, Depends(get_services)],
     page: int = 1,
     page_size: int = 100,
+    cursor: str | None = None,
 ):
-    """List all query executions for a specific user"""
+    """
+    List all query executions for a specific user
+    Pass the `next_cursor` of a page as `cursor` to get the next one, `page` is kept for
+    compatibility but deep pages get slower
+    """
 
     # Calculate offset from page number
     offset = (page - 1) * page_size
+    after = _decode_execution_cursor(cursor)
 
     async with services.db.get_session() as session:
         result, total = await services.query_report_repo.list_by_user(
-            session, user.id, offset, page_size
+            session, user.id, offset, page_size, after
         )
 
-        # Calculate pagination metadata
-        total_pages = (total + page_size - 1) // page_size
-        next_page = page + 1 if page < total_pages else None
-        prev_page = page - 1 if page > 1 else None
-
         return AthenaQueryExecutionPagination(
             data=result,
-            pagination=PaginationMetadata(
-                total=total,
-                page=page,
-                page_size=page_size,
-                total_pages=total_pages,
-                next_page=next_page,
-                prev_page=prev_page,
+            pagination=build_pagination(
+                total,
+                page,
+                page_size,
+                next_cursor=_next_execution_cursor(result, page_size),
             ),
         )
 
@@ -404,31 +534,26 @@ async def list_query_executions(
     services: Annotated[Metaservices, Depends(get_services)],
     page: int = 1,
     page_size: int = 100,
+    cursor: str | None = None,
 ):
-    """List all executions of a specific query"""
+    """List all executions of a specific query, `cursor` works as in `list_user_executions`"""
 
     # Calculate offset from page number
     offset = (page - 1) * page_size
+    after = _decode_execution_cursor(cursor)
 
     async with services.db.get_session() as session:
         result, total = await services.query_report_repo.list_by_query(
-            session, query_id, user.id, offset, page_size
+            session, query_id, user.id, offset, page_size, after
         )
 
-        # Calculate pagination metadata
-        total_pages = (total + page_size - 1) // page_size
-        next_page = page + 1 if page < total_pages else None
-        prev_page = page - 1 if page > 1 else None
-
         return AthenaQueryExecutionPagination(
             data=result,
-            pagination=PaginationMetadata(
-                total=total,
-                page=page,
-                page_size=page_size,
-                total_pages=total_pages,
-                next_page=next_page,
-                prev_page=prev_page,
+            pagination=build_pagination(
+                total,
+                page,
+                page_size,
+                next_cursor=_next_execution_cursor(result, page_size),
             ),
         )
 
@@ -454,12 +579,10 @@ async def get_query_execution_by_athena_id(
         if execution.status != QueryExecutionStatus.PENDING:
             return execution
 
-        # Get the user settings
-        user_settings = await services.user_settings_repo.get_by_id(
-            session, execution.user_settings_id, user.id
-        )
+        # The user settings are loaded along with the execution
+        user_settings = execution.user_settings
 
-        if user_settings is None:
+        if user_settings is None or user_settings.user_id != user.id:
             raise HTTPException(status_code=404, detail="User settings not found")
 
         # Get the athena client
@@ -493,6 +616,9 @@ async def get_query_execution_result(
     user: Annotated[User, Depends(get_current_user)],
     services: Annotated[Metaservices, Depends(get_services)],
     settings: Annotated[MetaSettings, Depends(get_settings)],
+    process_pool: Annotated[ProcessPoolExecutor, Depends(get_process_pool)],
+    request: Request,
+    response: Response,
     format: Format = Query("excel", description="Response format - 'excel' or 'json'"),
 ):
     """Get the results of a query execution
@@ -518,12 +644,22 @@ async def get_query_execution_result(
         ]:
             return execution
 
-        # Get the user settings
-        user_settings = await services.user_settings_repo.get_by_id(
-            session, execution.user_settings_id, user.id
-        )
+        # Repeat downloads of succeeded results are answered from the client's cache
+        cache_headers = {}
+        if execution.status == QueryExecutionStatus.SUCCEEDED:
+            etag = _result_etag(execution_id, format)
+            cache_headers = {
+                "ETag": etag,
+                "Cache-Control": "private, max-age=3600, immutable",
+            }
+            if_none_match = request.headers.get("if-none-match", "")
+            if etag in (tag.strip() for tag in if_none_match.split(",")):
+                return Response(status_code=304, headers=cache_headers)
 
-        if user_settings is None:
+        # The user settings are loaded along with the execution
+        user_settings = execution.user_settings
+
+        if user_settings is None or user_settings.user_id != user.id:
             raise HTTPException(status_code=404, detail="User settings not found")
 
         # Get the athena client
@@ -542,28 +678,23 @@ async def get_query_execution_result(
 
         # Return JSON if requested
         if format == Format.json:
+            response.headers.update(cache_headers)
             return {
                 "query_type": execution.query.query_subtype,
                 "data": result if not isinstance(result, Exception) else [],
             }
 
         # Otherwise return Excel (default)
-        excel_file = await asyncio.to_thread(
-            result_to_excel,
+        return await _excel_response(
+            process_pool,
             settings.template_path,
             {
                 execution.query.query_subtype: result
                 if not isinstance(result, Exception)
                 else []
             },
-        )
-
-        return StreamingResponse(
-            iter([excel_file]),  # Wrap bytes in an iterator
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={
-                "Content-Disposition": f"attachment; filename={execution_id}.xlsx"
-            },
+            f"{execution_id}.xlsx",
+            cache_headers,
         )
 
 
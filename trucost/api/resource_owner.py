@@ -1,9 +1,10 @@
 from typing import Annotated, List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.exc import SQLAlchemyError
 
 from trucost.api.auth import get_current_user
+from trucost.api.cost_optimization import clear_cost_summaries
 from trucost.core.models.resource_owner import (
     ResourceOwnerResponse,
     ResourceOwnerPagination,
@@ -13,7 +14,11 @@ from trucost.core.models.resource_owner import (
     ResourceOwnerCreateListRequest,
 )
 from trucost.core.models.user import User
-from trucost.core.models.common.pagination import PaginationMetadata
+from trucost.core.models.common.pagination import (
+    build_pagination,
+    encode_cursor,
+    decode_cursor,
+)
 from trucost.core.injector import get_services, get_settings
 from trucost.core.settings import Metaservices, MetaSettings
 
@@ -44,10 +49,10 @@ async def assign_all_resource_owners(
                 )
             )
 
-            responses = []
-            for resource_owner in resource_owners:
-                responses.append(ResourceOwnerResponse.model_validate(resource_owner))
-            return responses
+            clear_cost_summaries(user.account_id)
+
+            # Validated once against the response model, not per row here as well
+            return resource_owners
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
@@ -61,40 +66,19 @@ async def assign_resource_owner(
 ):
     """Create a new resource owner"""
     try:
-        results = []
         async with services.summary_db_factory.get_session(
             user.account_id, settings, services
         ) as session:
-            for ro_item in data.resource_owners:
-                # First check if resource owner already exists
-                existing_owner = await services.resource_owner_repo.get_resource_owner(
-                    session,
-                    ro_item.resource_id,
-                    ro_item.account_id,
-                )
-                if existing_owner:
-                    # update existing resource owner
-                    result = await services.resource_owner_repo.update(
-                        session,
-                        ro_item.resource_id,
-                        ro_item.account_id,
-                        data.owner_name,
-                        data.owner_email,
-                        data.status,
-                    )
-                    results.append(ResourceOwnerResponse.model_validate(result))
-                else:
-                    # Create new resource owner
-                    result = await services.resource_owner_repo.create(
-                        session,
-                        ro_item.resource_id,
-                        ro_item.account_id,
-                        data.owner_name,
-                        data.owner_email,
-                        data.status,
-                    )
-                    results.append(ResourceOwnerResponse.model_validate(result))
-            return results
+            # Existing owners are updated and missing ones created, in one transaction
+            resource_owners = await services.resource_owner_repo.assign_many(
+                session,
+                data.resource_owners,
+                data.owner_name,
+                data.owner_email,
+                data.status,
+            )
+            clear_cost_summaries(user.account_id)
+            return resource_owners
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
@@ -124,7 +108,13 @@ async def get_resource_owner(
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
-@router.get("/", response_model=ResourceOwnerPagination)
+# The page is built from trusted rows without validation and serialized by pydantic-core,
+# `response_model=None` skips validating it again, `responses` keeps it documented
+@router.get(
+    "/",
+    response_model=None,
+    responses={200: {"model": ResourceOwnerPagination}},
+)
 async def list_resource_owners(
     user: Annotated[User, Depends(get_current_user)],
     services: Annotated[Metaservices, Depends(get_services)],
@@ -132,8 +122,20 @@ async def list_resource_owners(
     page: int = 1,
     page_size: int = 100,
     status: ResourceOwnerStatus | None = None,
+    cursor: str | None = None,
 ):
-    """List all resource owners with pagination and optional status filter"""
+    """
+    List all resource owners with pagination and optional status filter
+    Pass the `next_cursor` of a page as `cursor` to get the next one
+    """
+    after_id = None
+    if cursor:
+        try:
+            (after_id,) = decode_cursor(cursor)
+            after_id = int(after_id)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
     try:
         offset = (page - 1) * page_size
         async with services.summary_db_factory.get_session(
@@ -144,26 +146,25 @@ async def list_resource_owners(
                 offset=offset,
                 limit=page_size,
                 status=status,
+                after_id=after_id,
             )
 
-            total_pages = (total + page_size - 1) // page_size
-            next_page = page + 1 if page < total_pages else None
-            previous_page = page - 1 if page > 1 else None
-
-            return ResourceOwnerPagination(
-                data=owners,
-                pagination=PaginationMetadata(
-                    total=total,
-                    page=page,
-                    page_size=page_size,
-                    total_pages=total_pages,
-                    next_page=next_page,
-                    previous_page=previous_page,
+            page_data = ResourceOwnerPagination(
+                data=[ResourceOwnerResponse.from_row(owner) for owner in owners],
+                pagination=build_pagination(
+                    total,
+                    page,
+                    page_size,
+                    next_cursor=encode_cursor(owners[-1].id)
+                    if len(owners) == page_size
+                    else None,
                 ),
             )
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+    return Response(content=page_data.model_dump_json(), media_type="application/json")
+
 
 @router.put("/{resource_id}", response_model=ResourceOwnerResponse)
 async def update_resource_owner(
@@ -187,9 +188,11 @@ async def update_resource_owner(
                     detail="Resource owner not found",
                 )
 
-            return await services.resource_owner_repo.update(
+            updated_owner = await services.resource_owner_repo.update(
                 session, existing_owner.id, resource_owner
             )
+            clear_cost_summaries(user.account_id)
+            return updated_owner
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
@@ -216,6 +219,7 @@ async def delete_resource_owner(
                 )
 
             await services.resource_owner_repo.delete(session, existing_owner.id)
+            clear_cost_summaries(user.account_id)
             return existing_owner
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Internal Server Error")
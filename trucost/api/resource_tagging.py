@@ -1,9 +1,16 @@
+import logging
 from typing import Annotated, List
-from fastapi import APIRouter, Depends, HTTPException
+
+import orjson
+
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import TypeAdapter
 from sqlalchemy.exc import SQLAlchemyError
 
 from trucost.api.auth import get_current_user
 from trucost.core.models.resource_tagging import (
+    ResourceTagMapping,
     ResourceTagMappingResponse,
     ResourceTagMappingPagination,
     ResourceTagMappingUpdate,
@@ -12,14 +19,51 @@ from trucost.core.models.resource_tagging import (
 )
 from trucost.core.models.common.filter import FilterOperator, SortConfig
 from trucost.core.models.user import User
-from trucost.core.models.common.pagination import PaginationMetadata
+from trucost.core.models.common.pagination import (
+    build_pagination,
+    encode_cursor,
+    decode_cursor,
+)
 from trucost.core.injector import get_services, get_settings
 from trucost.core.settings import Metaservices, MetaSettings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/resource-tagging", tags=["Resource Tagging"])
 
+# Built once, a page of ORM rows is validated in a single pass instead of per row
+_tag_list_adapter = TypeAdapter(List[ResourceTagMappingResponse])
+
+# (account id, filters) -> total of the listing. The first page always counts and
+# refreshes it, the following pages reuse it instead of counting the table again.
+# The user tag updates below drop the account's entries, they change the filtered counts
+_tag_list_totals = TTLCache(maxsize=256, ttl=30)
+
+# (account id, filters) -> encoded facets, the summary data only changes on the periodic
+# loads and the user tag updates below, which drop the account's entries
+_facets_cache = TTLCache(maxsize=1_000, ttl=5 * 60)
+
+
+def _filters_key(account_id: str, filters: List[FilterOperator] | None) -> tuple:
+    return (account_id, tuple(f.model_dump_json() for f in filters or ()))
 
-@router.get("/{resource_id}")
+
+def _clear_account_caches(account_id: str):
+    """Drop the account's cached facets and listing totals after a user tag update"""
+    for cache in (_facets_cache, _tag_list_totals):
+        for key in [key for key in cache if key[0] == account_id]:
+            cache.pop(key, None)
+
+
+def _tag_response(mapping: ResourceTagMapping) -> Response:
+    """A mapping validated and serialized by pydantic-core, not walked by jsonable_encoder"""
+    return Response(
+        content=ResourceTagMappingResponse.model_validate(mapping).model_dump_json(),
+        media_type="application/json",
+    )
+
+
+@router.get("/{resource_id}", responses={200: {"model": ResourceTagMappingResponse}})
 async def get_resource_tag(
     resource_id: str,
     user: Annotated[User, Depends(get_current_user)],
@@ -39,12 +83,12 @@ async def get_resource_tag(
                     status_code=404,
                     detail=f"Resource tag mapping not found for ID: {resource_id}",
                 )
-            return ResourceTagMappingResponse.model_validate(result)
+            return _tag_response(result)
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/")
+@router.post("/", responses={200: {"model": ResourceTagMappingPagination}})
 async def list_resource_tags(
     user: Annotated[User, Depends(get_current_user)],
     services: Annotated[Metaservices, Depends(get_services)],
@@ -53,11 +97,30 @@ async def list_resource_tags(
     sort: List[SortConfig] | None = None,
     page: int = 1,
     page_size: int = 10,
+    cursor: str | None = None,
 ):
-    """List resource tag mappings with pagination and optional filters"""
+    """
+    List resource tag mappings with pagination and optional filters
+    Without `sort`, pass the `next_cursor` of a page as `cursor` to get the next one
+    """
+    after_resource_id = None
+    if cursor:
+        if sort:
+            raise HTTPException(
+                status_code=400, detail="Cursor pagination does not support sort"
+            )
+        try:
+            (after_resource_id,) = decode_cursor(cursor)
+            after_resource_id = str(after_resource_id)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
     try:
         offset = (page - 1) * page_size
 
+        total_key = _filters_key(user.account_id, filters)
+        cached_total = _tag_list_totals.get(total_key) if page > 1 or cursor else None
+
         async with services.summary_db_factory.get_session(
             user.account_id, settings, services
         ) as session:
@@ -67,34 +130,34 @@ async def list_resource_tags(
                 limit=page_size,
                 filters=filters,
                 sort=sort,
+                with_total=cached_total is None,
+                after_resource_id=after_resource_id,
             )
+            if total is None:
+                total = cached_total
+            else:
+                _tag_list_totals[total_key] = total
 
-            total_pages = (total + page_size - 1) // page_size
-            next_page = page + 1 if page < total_pages else None
-            prev_page = page - 1 if page > 1 else None
-
-            return ResourceTagMappingPagination(
-                data=[ResourceTagMappingResponse.model_validate(r) for r in results],
-                pagination=PaginationMetadata(
-                    total=total,
-                    page=page,
-                    page_size=page_size,
-                    total_pages=total_pages,
-                    next_page=next_page,
-                    prev_page=prev_page,
+            page_data = ResourceTagMappingPagination(
+                data=_tag_list_adapter.validate_python(results, from_attributes=True),
+                pagination=build_pagination(
+                    total,
+                    page,
+                    page_size,
+                    next_cursor=encode_cursor(results[-1].resource_id)
+                    if not sort and len(results) == page_size
+                    else None,
                 ),
             )
+            # Serialized by pydantic-core directly, not walked again by jsonable_encoder
+            return Response(
+                content=page_data.model_dump_json(), media_type="application/json"
+            )
     except SQLAlchemyError as e:
-        print(f"SQLAlchemyError: {e}")
-        import traceback
-
-        print(traceback.format_exc())
+        logger.exception("Failed to list resource tag mappings")
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
-        print(f"Exception: {e}")
-        import traceback
-
-        print(traceback.format_exc())
+        logger.exception("Failed to list resource tag mappings")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -106,19 +169,26 @@ async def get_facets(
     filters: List[FilterOperator] | None = None,
 ):
     """Get facets for resource tag mappings"""
-    try:
-        async with services.summary_db_factory.get_session(
-            user.account_id, settings, services
-        ) as session:
-            result = await services.resource_tag_mapping_repo.get_facets(
-                session, filters
-            )
-            return result
-    except SQLAlchemyError as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    cache_key = _filters_key(user.account_id, filters)
+    content = _facets_cache.get(cache_key)
+    if content is None:
+        try:
+            async with services.summary_db_factory.get_session(
+                user.account_id, settings, services
+            ) as session:
+                result = await services.resource_tag_mapping_repo.get_facets(
+                    session, filters
+                )
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
+        content = orjson.dumps(result)
+        _facets_cache[cache_key] = content
 
-@router.put("/")
+    return Response(content=content, media_type="application/json")
+
+
+@router.put("/", responses={200: {"model": ResourceTagMappingResponse}})
 async def update_resource_tag(
     update_data: ResourceTagMappingUpdate,
     user: Annotated[User, Depends(get_current_user)],
@@ -135,16 +205,15 @@ async def update_resource_tag(
                 update_data.resource_id,
                 update_data.to_dict(),
             )
+            _clear_account_caches(user.account_id)
             if not result:
                 raise HTTPException(
                     status_code=404,
                     detail=f"Resource tag mapping not found for ID: {update_data.resource_id}",
                 )
-            return ResourceTagMappingResponse.model_validate(result)
+            return _tag_response(result)
     except SQLAlchemyError as e:
-        import traceback
-
-        print(traceback.format_exc())
+        logger.exception("Failed to update resource tag mapping")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -157,13 +226,13 @@ async def assign_all_resource_tags(
 ):
     """Assign all resource tags to the user"""
     try:
-        print(f"request-assign-all: {request.model_dump()=}")
         async with services.summary_db_factory.get_session(
             user.account_id, settings, services
         ) as session:
             result = await services.resource_tag_mapping_repo.assign_all_resource_tags(
                 session, request
             )
+            _clear_account_caches(user.account_id)
             return result
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -178,13 +247,13 @@ async def assign_resource_tags(
 ):
     """Assign resource tags to the user"""
     try:
-        print(f"request-assign-resource-tags: {request.model_dump()=}")
         async with services.summary_db_factory.get_session(
             user.account_id, settings, services
         ) as session:
             result = await services.resource_tag_mapping_repo.assign_resource_tags(
                 session, request
             )
+            _clear_account_caches(user.account_id)
             return result
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=str(e))
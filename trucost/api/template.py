@@ -1,6 +1,8 @@
 from typing import Annotated, List
 
-from fastapi import APIRouter, Depends, HTTPException
+from cachetools import TTLCache
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import TypeAdapter
 
 from trucost.api.auth import get_admin_user, get_current_user
 from trucost.core.models.template import (
@@ -13,13 +15,23 @@ from trucost.core.models.template import (
 )
 from trucost.core.repositories.template import UserAlreadyAssignedToTemplateError
 from trucost.core.models.user import User
-from trucost.core.models.common.pagination import PaginationMetadata
+from trucost.core.models.common.pagination import (
+    build_pagination,
+    encode_cursor,
+    decode_cursor,
+)
 from trucost.core.injector import get_services
 from trucost.core.settings import Metaservices
 
 
 router = APIRouter(prefix="/templates", tags=["Templates"])
 
+_template_queries_adapter = TypeAdapter(List[QueryTemplateAssignmentResponse])
+
+# user id -> encoded queries of the user's templates, polled by the dashboards. Hits are
+# served as-is, the cache is cleared whenever a template assignment changes
+_user_templates_queries_cache = TTLCache(maxsize=1_000, ttl=60)
+
 
 @router.post("", response_model=TemplateResponse)
 async def create_template(
@@ -30,7 +42,7 @@ async def create_template(
     """Create a new template."""
 
     async with services.db.get_session() as session:
-        return await services.template_repo.create_template(
+        created = await services.template_repo.create_template(
             session=session,
             name=template.name,
             description=template.description,
@@ -38,28 +50,58 @@ async def create_template(
             user_ids=template.user_ids,
             query_template_assignments=template.query_template_assignments,
         )
+    _user_templates_queries_cache.clear()
+    return created
 
 
-@router.get("/queries", response_model=List[QueryTemplateAssignmentResponse])
+@router.get(
+    "/queries",
+    response_model=None,
+    responses={200: {"model": List[QueryTemplateAssignmentResponse]}},
+)
 async def get_user_templates_queries(
     user: Annotated[User, Depends(get_current_user)],
     services: Annotated[Metaservices, Depends(get_services)],
 ):
-    async with services.db.get_session() as session:
-        queries = await services.template_repo.get_user_templates_queries(
-            session, user.id
+    content = _user_templates_queries_cache.get(user.id)
+    if content is None:
+        async with services.db.get_session() as session:
+            queries = await services.template_repo.get_user_templates_queries(
+                session, user.id
+            )
+        content = _template_queries_adapter.dump_json(
+            _template_queries_adapter.validate_python(queries, from_attributes=True)
         )
-        return queries
+        _user_templates_queries_cache[user.id] = content
 
+    return Response(content=content, media_type="application/json")
 
-@router.get("", response_model=TemplateListResponse)
+
+# The page is already built as a `TemplateListResponse`, `response_model=None` skips
+# the dump and revalidation against the same model, `responses` keeps it documented
+@router.get(
+    "",
+    response_model=None,
+    responses={200: {"model": TemplateListResponse}},
+)
 async def list_templates(
     user: Annotated[User, Depends(get_admin_user)],
     services: Annotated[Metaservices, Depends(get_services)],
     page: int = 1,
     page_size: int = 100,
+    cursor: str | None = None,
 ) -> TemplateListResponse:
-    """List templates with pagination."""
+    """
+    List templates with pagination.
+    Pass the `next_cursor` of a page as `cursor` to get the next one
+    """
+    after_id = None
+    if cursor:
+        try:
+            (after_id,) = decode_cursor(cursor)
+            after_id = int(after_id)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
 
     offset = (page - 1) * page_size
 
@@ -68,21 +110,18 @@ async def list_templates(
             session=session,
             offset=offset,
             limit=page_size,
+            after_id=after_id,
         )
 
-        total_pages = (total + page_size - 1) // page_size
-        next_page = page + 1 if page < total_pages else None
-        previous_page = page - 1 if page > 1 else None
-
         return TemplateListResponse(
             data=templates,
-            pagination=PaginationMetadata(
-                total=total,
-                page=page,
-                page_size=page_size,
-                total_pages=total_pages,
-                next_page=next_page,
-                previous_page=previous_page,
+            pagination=build_pagination(
+                total,
+                page,
+                page_size,
+                next_cursor=encode_cursor(templates[-1].id)
+                if len(templates) == page_size
+                else None,
             ),
         )
 
@@ -112,6 +151,8 @@ async def update_users_to_template_assignment(
                 user_ids=template_assign.exclude_user_ids,
             )
 
+    _user_templates_queries_cache.clear()
+
 
 @router.put("/queries")
 async def update_queries_to_template_assignment(
@@ -135,3 +176,5 @@ async def update_queries_to_template_assignment(
                 template_id=template_assign.template_id,
                 query_template_ids=template_assign.exclude_query_template_ids,
             )
+
+    _user_templates_queries_cache.clear()
@@ -4,8 +4,8 @@ from fastapi import APIRouter, HTTPException, Depends, status
 
 from trucost.api.auth import get_current_user
 from trucost.core.models.user import User
+from trucost.core.models.common.pagination import build_pagination
 from trucost.core.models.user_settings import (
-    PaginationMetadata,
     PaginatedUserSettingsResponse,
     UserSettingsCreateRequest,
     UserSettingsCreate,
@@ -26,21 +26,16 @@ async def create_user_settings(
 ):
     """Create user settings for the authenticated user"""
     async with services.db.get_session() as session:
-        # Check if settings already exist for the user
-        existing_settings = await services.user_settings_repo.get_by_name(
-            session, settings.name, user.id
+        created_settings = await services.user_settings_repo.create(
+            session,
+            UserSettingsCreate(user_id=user.id, **settings.model_dump()),
         )
-        if existing_settings:
+        if not created_settings:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User settings already exist",
             )
-
-        # Create new settings
-        return await services.user_settings_repo.create(
-            session,
-            UserSettingsCreate(user_id=user.id, **settings.model_dump()),
-        )
+        return created_settings
 
 
 @router.put("/", response_model=UserSettingsResponse)
@@ -54,29 +49,30 @@ async def update_user_settings(
     """
 
     async with services.db.get_session() as session:
-        existing_settings = await services.user_settings_repo.get_by_id(
-            session, settings.id, user.id
+        updated_settings = await services.user_settings_repo.update(
+            session, settings.id, user.id, settings
         )
-        if not existing_settings:
+        if not updated_settings:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User settings not found",
             )
-
-        # Update settings
-        updated_settings = await services.user_settings_repo.update(
-            session, existing_settings.id, settings
-        )
         return updated_settings
 
 
-@router.get("/", response_model=PaginatedUserSettingsResponse)
+# The page is already built as a `PaginatedUserSettingsResponse`, `response_model=None`
+# skips the dump and revalidation against the same model, `responses` keeps it documented
+@router.get(
+    "/",
+    response_model=None,
+    responses={200: {"model": PaginatedUserSettingsResponse}},
+)
 async def list_user_settings(
     user: Annotated[User, Depends(get_current_user)],
     services: Annotated[Metaservices, Depends(get_services)],
     page: int = 1,
     page_size: int = 100,
-):
+) -> PaginatedUserSettingsResponse:
     """List all user settings with detailed pagination metadata
 
     Args:
@@ -94,21 +90,9 @@ async def list_user_settings(
             session, user.id, offset, page_size
         )
 
-        # Calculate pagination metadata
-        total_pages = (total + page_size - 1) // page_size
-        next_page = page + 1 if page < total_pages else None
-        prev_page = page - 1 if page > 1 else None
-
         return PaginatedUserSettingsResponse(
             data=items,
-            pagination=PaginationMetadata(
-                total=total,
-                page=page,
-                page_size=page_size,
-                total_pages=total_pages,
-                next_page=next_page,
-                prev_page=prev_page,
-            ),
+            pagination=build_pagination(total, page, page_size),
         )
 
 
@@ -139,7 +123,7 @@ async def delete_user_settings(
 ):
     """Delete user settings for the authenticated user"""
     async with services.db.get_session() as session:
-        settings = await services.user_settings_repo.get_by_id(
+        settings = await services.user_settings_repo.delete(
             session, settings_id, user.id
         )
         if not settings:
@@ -147,6 +131,4 @@ async def delete_user_settings(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User settings not found",
             )
-
-        await services.user_settings_repo.delete(session, settings.id)
         return settings
@@ -1,4 +1,10 @@
-from typing import Literal, AsyncGenerator
+import logging
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Literal, AsyncGenerator
 from dataclasses import dataclass
 from contextlib import asynccontextmanager
 from functools import partial
@@ -6,7 +12,7 @@ from typing import cast
 
 
 from fastapi import FastAPI, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from fastapi.security import OAuth2PasswordBearer
@@ -35,28 +41,72 @@ from trucost.core.services.dynamo_db import DynamoDBService
 from trucost.core.router import root_router
 
 
-@dataclass
+@dataclass(slots=True)
 class State:
     """
     Adds type checking to the `state` of `FastAPI.App`.
+    Set as the app state itself, its fields are plain slot reads, not looked up
+    through Starlette's `State.__getattr__`.
     """
 
     settings: "MetaSettings"
     services: "Metaservices"
     oauth_scheme: OAuth2PasswordBearer
+    # Shared by the CPU bound work (Excel parsing, workbook exports), set by the lifespan
+    process_pool: ProcessPoolExecutor | None = None
+
+
+def start_log_listener() -> Callable[[], None]:
+    """
+    Moves the root logger handlers behind a queue, so log I/O happens on the
+    listener thread instead of blocking the event loop.
+    Returns the teardown, it stops the listener and puts the original handlers back.
+    """
+    root_logger = logging.getLogger()
+    original_handlers = root_logger.handlers[:]
+    handlers = original_handlers or [logging.StreamHandler()]
+    for handler in original_handlers:
+        root_logger.removeHandler(handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    root_logger.addHandler(queue_handler)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    def stop_log_listener():
+        # Flushes the queued records, then logging goes to the handlers directly again
+        listener.stop()
+        root_logger.removeHandler(queue_handler)
+        for handler in original_handlers:
+            root_logger.addHandler(handler)
+
+    return stop_log_listener
 
 
 @asynccontextmanager
 async def lifespan(app: "App", settings: MetaSettings) -> AsyncGenerator[None, None]:
     services: "Metaservices" = app.state.services
 
-    async with services.lifespan(settings, services):
-        app.add_api_route(
-            "/health",
-            App.health_check,
-        )
-
-        yield
+    stop_log_listener = start_log_listener()
+    # Workers are forked from a forkserver, not from this process whose threads (event
+    # loop executors, the log listener, boto3) could hold locks at fork time
+    app.state.process_pool = ProcessPoolExecutor(
+        max_workers=os.cpu_count(),
+        mp_context=multiprocessing.get_context("forkserver"),
+    )
+    try:
+        async with services.lifespan(settings, services):
+            app.add_api_route(
+                "/health",
+                App.health_check,
+            )
+
+            yield
+    finally:
+        app.state.process_pool.shutdown(cancel_futures=True)
+        stop_log_listener()
 
 
 class App(FastAPI):
@@ -80,6 +130,7 @@ class App(FastAPI):
             "description": settings.metadata.description,
             "author": settings.metadata.author,
             "lifespan": partial(lifespan, settings=settings),
+            "default_response_class": ORJSONResponse,
         }
         super().__init__(*args, **_kwargs)
 
@@ -103,8 +154,6 @@ class App(FastAPI):
         # Router configuration
         self.include_router(router=root_router, prefix="/api")
 
-        print(f"App state: {self.state}")
-
     def _get_services(self, settings: MetaSettings) -> Metaservices:
         db = DBService(AvailableDB.POSTGRES)
         jwt_auth = JWTAuthService(
@@ -166,4 +215,4 @@ class App(FastAPI):
 
     @staticmethod
     async def health_check(req: Request) -> Response:
-        return JSONResponse(status_code=200, content={"status": "ok"})
+        return ORJSONResponse(status_code=200, content={"status": "ok"})
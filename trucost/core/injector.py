@@ -1,20 +1,29 @@
+from concurrent.futures import ProcessPoolExecutor
+
 from fastapi import Request
 from fastapi.security import OAuth2PasswordBearer
 from trucost.core.models.user import User
 from trucost.core.settings import Metaservices, MetaSettings
 
+# These only read from the app state. They are `async` so fastapi calls them
+# inline, plain `def` dependencies are sent to the threadpool on every request
+
 
-def get_user(request: Request) -> User:
+async def get_user(request: Request) -> User:
     return request.state.user
 
 
-def get_services(request: Request) -> Metaservices:
+async def get_services(request: Request) -> Metaservices:
     return request.app.state.services
 
 
-def get_settings(request: Request) -> MetaSettings:
+async def get_settings(request: Request) -> MetaSettings:
     return request.app.state.settings
 
 
+async def get_process_pool(request: Request) -> ProcessPoolExecutor:
+    return request.app.state.process_pool
+
+
 async def get_oauth_scheme(request: Request) -> OAuth2PasswordBearer:
     return await request.app.state.oauth_scheme(request)
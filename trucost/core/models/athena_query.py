@@ -1,14 +1,15 @@
 import hashlib
-from datetime import datetime, timezone
-from functools import partial
+import re
+from datetime import datetime
+from functools import lru_cache
 
-import sqlglot
+from sqlglot.dialects.dialect import Dialect
 from sqlglot.expressions import (
     Select as SqlglotSelect,
     Column as SqlglotColumn,
 )
 from pydantic import BaseModel
-from sqlalchemy import Column, String, DateTime, Integer, UniqueConstraint, JSON
+from sqlalchemy import Column, String, DateTime, Integer, UniqueConstraint, JSON, func
 from sqlalchemy.orm import relationship
 
 from trucost.core.models.base import Base
@@ -24,19 +25,20 @@ class AthenaQuery(Base):
     category_type = Column(String)
     query_type = Column(String)
     query_subtype = Column(String)
+    # Filled in by the database, not computed and sent with every insert
     created_at = Column(
         DateTime,
-        default=partial(datetime.now, timezone.utc),
+        server_default=func.now(),
         nullable=False,
     )
     updated_at = Column(
         DateTime,
-        default=partial(datetime.now, timezone.utc),
-        onupdate=partial(datetime.now, timezone.utc),
+        server_default=func.now(),
+        onupdate=func.now(),
     )
     deleted_at = Column(
         DateTime,
-        default=partial(datetime.now, timezone.utc),
+        server_default=func.now(),
         nullable=True,
     )
     query_hash = Column(String, nullable=False, unique=True)
@@ -66,32 +68,48 @@ class AthenaQuery(Base):
     )
 
     @staticmethod
+    @lru_cache(maxsize=4096)
     def get_query_hash(query: str) -> str:
+        # Stays sha256, the hashes of the stored queries are compared against it
         return hashlib.sha256(query.encode()).hexdigest()
 
     @staticmethod
     def get_top_level_select_columns(sql: str) -> list[str]:
-        # Parse the query
-        sql = (
-            sql.replace("${table_name}$", "table_name")
-            .replace("${year}$", "2024")
-            .replace("${month}$", "01")
-        )
+        return list(_get_top_level_select_columns(sql))
 
-        parsed = sqlglot.parse_one(sql)
 
-        # Find only the top-level SELECT (ignore subqueries)
-        top_level_select = parsed.find(SqlglotSelect)
+# Athena runs Trino SQL, the dialect, tokenizer and parser are built once instead of
+# by parse_one on every call
+_DIALECT = Dialect.get_or_raise("trino")
+_TOKENIZER = _DIALECT.tokenizer()
+_PARSER = _DIALECT.parser()
 
-        # Extract column aliases or names
-        columns = []
-        for expr in top_level_select.expressions:
-            alias = expr.alias
-            if alias:
-                columns.append(alias)
-            elif isinstance(expr, SqlglotColumn):
-                columns.append(expr.name)
-        return columns
+# Query placeholders and the sample values they are parsed with, filled in one pass
+_PLACEHOLDER_VALUES = {"table_name": "table_name", "year": "2024", "month": "01"}
+_PLACEHOLDER_PATTERN = re.compile(r"\$\{(table_name|year|month)\}\$")
+
+
+# Parsing dominates query ingestion, the same query text is only parsed once
+@lru_cache(maxsize=4096)
+def _get_top_level_select_columns(sql: str) -> tuple[str, ...]:
+    # Parse the query
+    sql = _PLACEHOLDER_PATTERN.sub(lambda m: _PLACEHOLDER_VALUES[m[1]], sql)
+
+    parsed = _PARSER.parse(_TOKENIZER.tokenize(sql), sql)[0]
+
+    # Find only the top-level SELECT (ignore subqueries), the root itself in most cases
+    top_level_select = (
+        parsed
+        if isinstance(parsed, SqlglotSelect)
+        else parsed.find(SqlglotSelect, bfs=False)
+    )
+
+    # Extract column aliases or names, unaliased expressions are skipped
+    return tuple(
+        alias or expr.name
+        for expr in top_level_select.expressions
+        if (alias := expr.alias) or isinstance(expr, SqlglotColumn)
+    )
 
 
 class AthenaQueryCreate(BaseModel):
@@ -125,17 +143,11 @@ class AthenaQueryUpdate(BaseModel):
 
 class AthenaQueryDbUpdate(BaseModel):
     query: str
-    updated_at: datetime | None = None
-
-    def __init__(self, **data):
-        super().__init__(**data)
-        self.updated_at = datetime.now(timezone.utc)
 
     def to_dict(self) -> dict:
         return {
             "query": self.query,
             "query_hash": AthenaQuery.get_query_hash(self.query),
-            "updated_at": self.updated_at,
         }
 
 
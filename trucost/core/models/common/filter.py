@@ -5,8 +5,9 @@ from pydantic import BaseModel, Field
 
 class FilterOperator(BaseModel):
     field: str = Field(..., description="Field name to filter on")
-    operator: str = Field(
-        ..., description="Operator for comparison (eq, ne, gt, lt, gte, lte, in, like)"
+    operator: Literal["eq", "ne", "gt", "lt", "gte", "lte", "in", "like", "is"] = Field(
+        ...,
+        description="Operator for comparison (eq, ne, gt, lt, gte, lte, in, like, is)",
     )
     value: Union[str, int, float, List[Union[str, int, float]], None] = Field(
         ..., description="Value to compare against"
@@ -1,10 +1,61 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+import base64
+from functools import lru_cache
+from typing import Any, Optional
+
+import orjson
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class PaginationMetadata(BaseModel):
+    # Frozen so the cached instances can be shared between responses
+    model_config = ConfigDict(frozen=True)
+
     total: int = Field(default=0, description="Total number of items")
     page: int = Field(default=0, description="Current page number")
     total_pages: int = Field(default=0, description="Total number of pages")
     next_page: Optional[int] = Field(default=None, description="Next page number")
     prev_page: Optional[int] = Field(default=None, description="Previous page number")
+    next_cursor: Optional[str] = Field(
+        default=None, description="Cursor of the next page, when paginating by cursor"
+    )
+
+
+def build_pagination(
+    total: int, page: int, page_size: int, next_cursor: str | None = None
+) -> PaginationMetadata:
+    """Pagination metadata of a page, the computed values are not validated again"""
+    if next_cursor is None:
+        # Offset pages repeat the same few (total, page, page_size), one instance each
+        return _offset_pagination(total, page, page_size)
+    return _build_pagination(total, page, page_size, next_cursor)
+
+
+@lru_cache(maxsize=4096)
+def _offset_pagination(total: int, page: int, page_size: int) -> PaginationMetadata:
+    return _build_pagination(total, page, page_size, None)
+
+
+def _build_pagination(
+    total: int, page: int, page_size: int, next_cursor: str | None
+) -> PaginationMetadata:
+    total_pages = -(-total // page_size)
+    return PaginationMetadata.model_construct(
+        total=total,
+        page=page,
+        total_pages=total_pages,
+        next_page=page + 1 if page < total_pages else None,
+        prev_page=page - 1 if page > 1 else None,
+        next_cursor=next_cursor,
+    )
+
+
+def encode_cursor(*key: Any) -> str:
+    """Opaque keyset pagination cursor from the sort key of the last row of a page"""
+    return base64.urlsafe_b64encode(orjson.dumps(key)).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        return orjson.loads(base64.urlsafe_b64decode(cursor))
+    except ValueError as e:
+        raise ValueError(f"Invalid cursor: {cursor=}") from e
@@ -2,7 +2,7 @@ from typing import Optional, List, Dict
 from datetime import datetime
 
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, String, Float, Integer
+from sqlalchemy import Column, String, Float, Integer, Index
 from sqlalchemy.types import DateTime, JSON
 
 from trucost.core.models.base import SummaryBase
@@ -35,6 +35,24 @@ class CostOptimize(SummaryBase):
     last_updated = Column(DateTime, nullable=True)
     Source = Column(String(20), nullable=True)
 
+    # The table is created by the summary loads, these are created once it exists by
+    # `ensure_loaded_table_indexes` when the summary database is first used
+    __table_args__ = (
+        # The account, product and billing period columns the dashboards filter and
+        # group on
+        Index(
+            "ix_cost_optimization_recommendations_account_product_period",
+            "payer_account_id",
+            "usage_account_id",
+            "product_code",
+            "year",
+            "month",
+        ),
+        Index("ix_cost_optimization_recommendations_query_date", "query_date"),
+        # The resource owner join and the resource id filters
+        Index("ix_cost_optimization_recommendations_resource_id", "resource_id"),
+    )
+
 
 class CostOptimizeResponse(BaseModel):
     id: int
@@ -68,6 +86,11 @@ class CostOptimizeWithResourceOwner(CostOptimizeResponse):
     owner_email: str | None = None
     status: str | None = None
 
+    @classmethod
+    def from_row(cls, row: dict) -> "CostOptimizeWithResourceOwner":
+        """Built without validation, the row is read from the typed summary tables"""
+        return cls.model_construct(**row)
+
 
 class ErrorResponse(BaseModel):
     error_code: int
@@ -10,6 +10,7 @@ from sqlalchemy import (
     Integer,
     ForeignKey,
     Enum as SQLEnum,
+    Index,
 )
 from sqlalchemy.orm import relationship
 
@@ -76,6 +77,18 @@ class AthenaQueryExecution(Base):
         back_populates="query_executions",
     )
 
+    # Keyset pagination of the executions, newest first
+    __table_args__ = (
+        Index("ix_athena_query_executions_user_created", "user_id", "created_at", "id"),
+        Index(
+            "ix_athena_query_executions_query_created",
+            "query_id",
+            "user_id",
+            "created_at",
+            "id",
+        ),
+    )
+
 
 class AthenaQueryExecutionCreate(BaseModel):
     user_settings_id: int
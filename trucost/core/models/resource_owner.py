@@ -4,7 +4,7 @@ from datetime import datetime, timezone
 from functools import partial
 
 from pydantic import BaseModel
-from sqlalchemy import Column, String, Integer, Enum as SQLEnum, DateTime
+from sqlalchemy import Column, String, Integer, Enum as SQLEnum, DateTime, Index
 
 from trucost.core.models.base import SummaryBase
 from trucost.core.models.common.filter import FilterOperator
@@ -37,6 +37,17 @@ class ResourceOwner(SummaryBase):
         nullable=True,
     )
 
+    __table_args__ = (
+        # Covers the join from the recommendations plus the status and owner the
+        # savings summaries group and filter on, without reading the table rows
+        Index(
+            "ix_resource_owner_resource_status_owner",
+            "resource_id",
+            "status",
+            "owner_email",
+        ),
+    )
+
 
 class ResourceOwnerCreateRequest(BaseModel):
     resource_id: str
@@ -71,6 +82,13 @@ class ResourceOwnerResponse(BaseModel):
     class Config:
         from_attributes = True
 
+    @classmethod
+    def from_row(cls, row: ResourceOwner) -> "ResourceOwnerResponse":
+        """Built without validation, the row is read from the typed summary table"""
+        return cls.model_construct(
+            **{field: getattr(row, field) for field in cls.model_fields}
+        )
+
 
 class ResourceOwnerPagination(BaseModel):
     data: List[ResourceOwnerResponse]
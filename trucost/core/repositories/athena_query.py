@@ -1,6 +1,8 @@
-from typing import List
+from itertools import batched
+from typing import AsyncIterable, AsyncIterator, Iterable, List, Sequence
 
 from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 
@@ -32,6 +34,8 @@ class AthenaQueryRepository(BaseService):
     The queries are used by the query-report service to trigger the athena query execution
     """
 
+    batch_size: int = 1000
+
     async def get_by_id(self, session: AsyncSession, id: int) -> AthenaQuery | None:
         """Get a athena query by id"""
         result = await session.execute(select(AthenaQuery).filter(AthenaQuery.id == id))
@@ -47,32 +51,63 @@ class AthenaQueryRepository(BaseService):
         return result.scalar_one_or_none()
 
     async def create(
-        self, session: AsyncSession, athena_queries: List[AthenaQueryCreate]
+        self,
+        session: AsyncSession,
+        athena_queries: Iterable[AthenaQueryCreate] | AsyncIterable[AthenaQueryCreate],
     ) -> List[AthenaQuery]:
-        """Create multiple athena queries"""
+        """
+        Create multiple athena queries
+        The queries are consumed and inserted in batches, so large uploads are never fully
+        held in memory before hitting the database. Each batch is a single
+        INSERT ... ON CONFLICT DO NOTHING RETURNING statement, a conflicting row is not
+        returned and fails the upload. Nothing is committed if any batch fails.
+        """
 
         queries = []
-        for athena_query in athena_queries:
-            if await self.get_by_query_hash(
-                session, AthenaQuery.get_query_hash(athena_query.query)
-            ):
-                raise QueryAlreadyExistsError("Query already exists")
-
-            print(f"Creating query: {athena_query.to_dict()}")
-
-            queries.append(
-                AthenaQuery(
-                    **athena_query.to_dict(),
-                    query_metadata=AthenaQuery.get_top_level_select_columns(
-                        athena_query.query
-                    ),
+        async for batch in self._batches(athena_queries):
+            result = await session.scalars(
+                pg_insert(AthenaQuery)
+                .values(
+                    [
+                        {
+                            **athena_query.to_dict(),
+                            "query_metadata": AthenaQuery.get_top_level_select_columns(
+                                athena_query.query
+                            ),
+                        }
+                        for athena_query in batch
+                    ]
                 )
+                .on_conflict_do_nothing()
+                .returning(AthenaQuery)
             )
+            batch_queries = result.all()
+            if len(batch_queries) != len(batch):
+                raise QueryAlreadyExistsError("Query already exists")
+
+            queries.extend(batch_queries)
 
-        session.add_all(queries)
         await session.commit()
         return queries
 
+    async def _batches(
+        self,
+        athena_queries: Iterable[AthenaQueryCreate] | AsyncIterable[AthenaQueryCreate],
+    ) -> AsyncIterator[Sequence[AthenaQueryCreate]]:
+        if not isinstance(athena_queries, AsyncIterable):
+            for batch in batched(athena_queries, self.batch_size):
+                yield batch
+            return
+
+        batch = []
+        async for athena_query in athena_queries:
+            batch.append(athena_query)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
     async def delete(
         self, session: AsyncSession, athena_query: AthenaQueryDelete
     ) -> None:
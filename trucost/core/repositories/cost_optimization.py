@@ -1,17 +1,30 @@
-from typing import List, Optional, Dict, Any, Tuple
+import logging
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, or_, case
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from trucost.core.models.cost_optimization import (
     CostOptimize,
     CostOptimizeResponse,
 )
-from trucost.core.models.resource_owner import ResourceOwner
+from trucost.core.models.resource_owner import ResourceOwner, ResourceOwnerStatus
 from trucost.core.models.common.filter import FilterOperator, GroupByConfig, SortConfig
 from trucost.core.services.base import BaseService
 from trucost.core.services.filter import Filter
 
+logger = logging.getLogger(__name__)
+
+# Savings status predicates, built once and shared by every summary query.
+# No status, TODO and WIP are potential savings, COMPLETED are achieved and
+# SUPRESSED are in neither
+_IS_POTENTIAL = or_(
+    ResourceOwner.status.is_(None),
+    ResourceOwner.status.in_([ResourceOwnerStatus.TODO, ResourceOwnerStatus.WIP]),
+)
+_IS_ACHIEVED = ResourceOwner.status == ResourceOwnerStatus.COMPLETED
+_HAS_SAVINGS = CostOptimize.unblended_cost > 0
+
 
 class CostOptimizationRepository(BaseService, Filter):
     """Repository for cost optimization data retrieval"""
@@ -46,7 +59,7 @@ class CostOptimizationRepository(BaseService, Filter):
         if end_filters:
             query = query.where(*end_filters)
 
-        print(query)
+        logger.debug("Aggregated cost data query: %s", query)
         # Execute query
         result = await session.execute(query)
 
@@ -58,6 +71,80 @@ class CostOptimizationRepository(BaseService, Filter):
             # For non-grouped results, return model instances
             return [CostOptimizeResponse(**row) for row in result.scalars().all()]
 
+    async def get_cost_summary(
+        self,
+        session: AsyncSession,
+        filters: Optional[List[FilterOperator]] = None,
+        ids: Optional[List[int]] = None,
+    ) -> Dict[str, float | None]:
+        """Get the potential and achieved savings of the filtered rows in a single pass"""
+        query = (
+            select(
+                func.sum(case((_IS_POTENTIAL, CostOptimize.unblended_cost))).label(
+                    "total_potential_savings"
+                ),
+                func.sum(case((_IS_ACHIEVED, CostOptimize.unblended_cost))).label(
+                    "total_achieved_savings"
+                ),
+            )
+            .select_from(CostOptimize)
+            .outerjoin(
+                ResourceOwner, CostOptimize.resource_id == ResourceOwner.resource_id
+            )
+        )
+
+        if filters:
+            query = self.apply_filters([CostOptimize, ResourceOwner], query, filters)
+
+        if ids:
+            query = query.where(ResourceOwner.id.in_(ids))
+
+        result = await session.execute(query)
+        return dict(result.one()._mapping)
+
+    async def get_savings_by_owner(
+        self,
+        session: AsyncSession,
+        filters: Optional[List[FilterOperator]] = None,
+        ids: Optional[List[int]] = None,
+    ) -> Dict[str | None, Dict[str, float]]:
+        """Get the potential and achieved savings of the filtered rows per owner email"""
+        query = (
+            select(
+                ResourceOwner.owner_email,
+                func.coalesce(
+                    func.sum(case((_IS_POTENTIAL, CostOptimize.unblended_cost))),
+                    0,
+                ).label("total_potential_savings"),
+                func.coalesce(
+                    func.sum(case((_IS_ACHIEVED, CostOptimize.unblended_cost))),
+                    0,
+                ).label("total_achieved_savings"),
+            )
+            .select_from(CostOptimize)
+            .outerjoin(
+                ResourceOwner, CostOptimize.resource_id == ResourceOwner.resource_id
+            )
+            # Rows without savings never count, they are not read at all
+            .where(_HAS_SAVINGS)
+            .group_by(ResourceOwner.owner_email)
+        )
+
+        if filters:
+            query = self.apply_filters([CostOptimize, ResourceOwner], query, filters)
+
+        if ids:
+            query = query.where(CostOptimize.id.in_(ids))
+
+        result = await session.execute(query)
+        return {
+            row.owner_email: {
+                "total_potential_savings": row.total_potential_savings,
+                "total_achieved_savings": row.total_achieved_savings,
+            }
+            for row in result
+        }
+
     async def get_all_cost_data(
         self,
         session: AsyncSession,
@@ -67,7 +154,9 @@ class CostOptimizationRepository(BaseService, Filter):
         sort: List[SortConfig] | None = None,
         ids: Optional[List[int]] = None,
     ) -> Tuple[List[Dict[str, Any]], int]:
-        """Get all cost optimization data with pagination and resource owner information"""
+        """
+        Get all cost optimization data with pagination and resource owner information
+        """
         # Create base query with join to ResourceOwner
         query = select(CostOptimize, ResourceOwner).outerjoin(
             ResourceOwner, CostOptimize.resource_id == ResourceOwner.resource_id
@@ -80,8 +169,11 @@ class CostOptimizationRepository(BaseService, Filter):
         if sort:
             query = self.apply_sorting(CostOptimize, query, sort)
 
-        if ids:
-            query = query.where(and_(CostOptimize.id.in_(ids)))
+        # Built once and pushed into both the page and the count, SQLAlchemy renders
+        # the list as a single expanding parameter so the statement stays cached
+        ids_filter = CostOptimize.id.in_(ids) if ids else None
+        if ids_filter is not None:
+            query = query.where(ids_filter)
 
         query = query.offset(offset).limit(limit)
 
@@ -92,7 +184,8 @@ class CostOptimizationRepository(BaseService, Filter):
             select(func.count())
             .select_from(CostOptimize, ResourceOwner)
             .outerjoin(
-                ResourceOwner, CostOptimize.resource_id == ResourceOwner.resource_id
+                ResourceOwner,
+                CostOptimize.resource_id == ResourceOwner.resource_id,
             )
         )
         if filters:
@@ -100,25 +193,60 @@ class CostOptimizationRepository(BaseService, Filter):
                 [CostOptimize, ResourceOwner], total_query, filters
             )
 
-        total = await session.execute(total_query)
+        if ids_filter is not None:
+            total_query = total_query.where(ids_filter)
+
+        total = (await session.execute(total_query)).scalar_one()
 
         # Convert results to dictionary with both cost and owner information
-        rows = result.all()
-        combined_data = []
-        for cost_row, owner_row in rows:
-            data = {
-                **cost_row.__dict__,
-                "owner_name": owner_row.owner_name if owner_row else None,
-                "owner_email": owner_row.owner_email if owner_row else None,
-                "status": owner_row.status.value
-                if owner_row and owner_row.status
-                else None,
-            }
-            # Remove SQLAlchemy internal state
-            data.pop("_sa_instance_state", None)
-            combined_data.append(data)
+        combined_data = [
+            self._combine_row(cost_row, owner_row) for cost_row, owner_row in result
+        ]
+
+        return combined_data, total
+
+    async def iter_cost_data(
+        self,
+        session: AsyncSession,
+        filters: List[FilterOperator] | None = None,
+        sort: List[SortConfig] | None = None,
+        ids: Optional[List[int]] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream all the cost optimization data matching the filters with the resource owner information
+        Rows are read from a server side cursor `batch_size` at a time, never all at once
+        """
+        query = select(CostOptimize, ResourceOwner).outerjoin(
+            ResourceOwner, CostOptimize.resource_id == ResourceOwner.resource_id
+        )
+
+        if filters:
+            query = self.apply_filters([CostOptimize, ResourceOwner], query, filters)
+
+        if sort:
+            query = self.apply_sorting(CostOptimize, query, sort)
+
+        if ids:
+            query = query.where(CostOptimize.id.in_(ids))
+
+        result = await session.stream(query.execution_options(yield_per=batch_size))
+        async for cost_row, owner_row in result:
+            yield self._combine_row(cost_row, owner_row)
 
-        return combined_data, total.scalar_one()
+    @staticmethod
+    def _combine_row(cost_row: CostOptimize, owner_row: ResourceOwner | None) -> dict:
+        data = {
+            **cost_row.__dict__,
+            "owner_name": owner_row.owner_name if owner_row else None,
+            "owner_email": owner_row.owner_email if owner_row else None,
+            "status": owner_row.status.value
+            if owner_row and owner_row.status
+            else None,
+        }
+        # Remove SQLAlchemy internal state
+        data.pop("_sa_instance_state", None)
+        return data
 
     async def get_filter_facets(
         self,
@@ -1,3 +1,6 @@
+from collections import defaultdict
+
+from cachetools import TTLCache
 from fastapi import HTTPException
 
 from sqlalchemy import select
@@ -15,11 +18,41 @@ from trucost.core.services.base import BaseService
 class GlobalSettingsRepository(BaseService):
     """Repository for global settings-related database operations"""
 
+    # Single entry holding user id -> dashboard ids, cleared whenever the global
+    # settings are written
+    _dashboards_by_user_cache = TTLCache(maxsize=1, ttl=5 * 60)
+
     async def get_global_settings(self, session: AsyncSession) -> GlobalSettings | None:
         """Get a global settings"""
         result = await session.execute(select(GlobalSettings).limit(1))
         return result.scalar_one_or_none()
 
+    async def get_dashboards_by_user(
+        self, session: AsyncSession
+    ) -> dict[int, list[str]]:
+        """Get the dashboard ids of every user, indexed in one pass over the mapping"""
+        dashboards_by_user = self._dashboards_by_user_cache.get(None)
+        if dashboards_by_user is None:
+            global_settings = await self.get_global_settings(session)
+
+            dashboards_by_user = defaultdict(list)
+            if global_settings:
+                for mapping in global_settings.user_role_dashboard_mapping:
+                    dashboards_by_user[mapping.get("user_id")].append(
+                        mapping.get("dashboard_id")
+                    )
+
+            dashboards_by_user = dict(dashboards_by_user)
+            self._dashboards_by_user_cache[None] = dashboards_by_user
+        return dashboards_by_user
+
+    async def get_user_dashboard_ids(
+        self, session: AsyncSession, user_id: int
+    ) -> list[str]:
+        """Get the dashboard ids mapped to a user"""
+        dashboards_by_user = await self.get_dashboards_by_user(session)
+        return dashboards_by_user.get(user_id, [])
+
     async def update_global_settings(
         self, session: AsyncSession, settings: GlobalSettingsUpdate
     ) -> GlobalSettings:
@@ -37,6 +70,7 @@ class GlobalSettingsRepository(BaseService):
         ]
         session.add(existing_settings)
         await session.commit()
+        self._dashboards_by_user_cache.clear()
         await session.refresh(existing_settings)
         return existing_settings
 
@@ -115,6 +149,7 @@ class GlobalSettingsRepository(BaseService):
 
             session.add(existing_settings)
             await session.commit()
+            self._dashboards_by_user_cache.clear()
             await session.refresh(existing_settings)
         except Exception as e:
             import traceback
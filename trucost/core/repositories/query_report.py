@@ -1,7 +1,8 @@
+from datetime import datetime
 from typing import List, Tuple
 
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func
 
@@ -40,12 +41,13 @@ class QueryReportRepository(BaseService):
     async def get_by_execution_id(
         self, session: AsyncSession, execution_id: str, user_id: int
     ) -> AthenaQueryExecution | None:
-        """Get a query execution by Athena execution id"""
+        """Get a query execution by Athena execution id with its query and user settings"""
+        # Many-to-one, joined in the same statement rather than loaded by extra selects
         result = await session.execute(
             select(AthenaQueryExecution)
             .options(
-                selectinload(AthenaQueryExecution.query),
-                selectinload(AthenaQueryExecution.user_settings),
+                joinedload(AthenaQueryExecution.query),
+                joinedload(AthenaQueryExecution.user_settings),
             )
             .filter(
                 AthenaQueryExecution.execution_id == execution_id,
@@ -110,53 +112,53 @@ class QueryReportRepository(BaseService):
         executions: List[AthenaQueryExecutionCreateWithUser],
     ) -> List[AthenaQueryExecution]:
         """Create a new query executions"""
-        query_executions = [
-            AthenaQueryExecution(
-                **execution.to_dict(),
-                status=(
-                    QueryExecutionStatus.FAILED
-                    if execution.error_message
-                    else QueryExecutionStatus.PENDING
-                ),
-            )
-            for execution in executions
-        ]
-
-        session.add_all(query_executions)
+        if not executions:
+            return []
+
+        # One bulk INSERT ... RETURNING instead of an add and a refresh per execution
+        result = await session.scalars(
+            insert(AthenaQueryExecution).returning(
+                AthenaQueryExecution, sort_by_parameter_order=True
+            ),
+            [
+                {
+                    **execution.to_dict(),
+                    "status": (
+                        QueryExecutionStatus.FAILED
+                        if execution.error_message
+                        else QueryExecutionStatus.PENDING
+                    ),
+                }
+                for execution in executions
+            ],
+        )
+        query_executions = result.all()
         await session.commit()
 
-        # Refresh each execution individually
-        for execution in query_executions:
-            await session.refresh(execution)
-
         return query_executions
 
     async def list_by_user(
-        self, session: AsyncSession, user_id: int, offset: int = 0, limit: int = 100
+        self,
+        session: AsyncSession,
+        user_id: int,
+        offset: int = 0,
+        limit: int = 100,
+        after: Tuple[datetime, int] | None = None,
     ) -> Tuple[List[AthenaQueryExecution], int]:
-        """List all query executions for a specific user"""
-
-        # Get total count
-        count_result = await session.execute(
-            select(func.count())
-            .select_from(AthenaQueryExecution)
-            .filter(AthenaQueryExecution.user_id == user_id)
+        """
+        List all query executions for a specific user
+        `after` is the (created_at, id) of the last execution of the previous page, the
+        page then starts right after it instead of skipping `offset` rows
+        """
+        return await self._list_page(
+            session,
+            [AthenaQueryExecution.user_id == user_id],
+            offset,
+            limit,
+            after,
+            selectinload(AthenaQueryExecution.query),
+            selectinload(AthenaQueryExecution.user_settings),
         )
-        total = count_result.scalar_one()
-
-        # Get paginated results
-        result = await session.execute(
-            select(AthenaQueryExecution)
-            .options(
-                selectinload(AthenaQueryExecution.query),
-                selectinload(AthenaQueryExecution.user_settings),
-            )
-            .filter(AthenaQueryExecution.user_id == user_id)
-            .order_by(AthenaQueryExecution.created_at.desc())
-            .offset(offset)
-            .limit(limit)
-        )
-        return result.scalars().all(), total
 
     async def list_by_query(
         self,
@@ -165,39 +167,83 @@ class QueryReportRepository(BaseService):
         user_id: int,
         offset: int = 0,
         limit: int = 100,
+        after: Tuple[datetime, int] | None = None,
     ) -> Tuple[List[AthenaQueryExecution], int]:
-        """List all executions of a specific query"""
-
-        # Get total count
-        count_result = await session.execute(
-            select(func.count())
-            .select_from(AthenaQueryExecution)
-            .filter(
+        """List all executions of a specific query, `after` works as in `list_by_user`"""
+        return await self._list_page(
+            session,
+            [
                 AthenaQueryExecution.query_id == query_id,
                 AthenaQueryExecution.user_id == user_id,
-            )
+            ],
+            offset,
+            limit,
+            after,
         )
-        total = count_result.scalar_one()
+
+    async def _list_page(
+        self,
+        session: AsyncSession,
+        filters: list,
+        offset: int,
+        limit: int,
+        after: Tuple[datetime, int] | None,
+        *options,
+    ) -> Tuple[List[AthenaQueryExecution], int]:
+        """A page of the filtered executions, newest first, and the total count"""
+        query = select(AthenaQueryExecution).options(*options).filter(*filters)
+
+        if after is None:
+            # The total is returned with every row of the page, no separate count
+            query = query.add_columns(func.count().over().label("total"))
+        else:
+            query = query.filter(*self._keyset_filter(after))
 
         result = await session.execute(
-            select(AthenaQueryExecution)
-            .filter(
-                AthenaQueryExecution.query_id == query_id,
-                AthenaQueryExecution.user_id == user_id,
+            query.order_by(
+                AthenaQueryExecution.created_at.desc(), AthenaQueryExecution.id.desc()
             )
-            .order_by(AthenaQueryExecution.created_at.desc())
-            .offset(offset)
+            .offset(0 if after else offset)
             .limit(limit)
         )
-        return result.scalars().all(), total
+
+        total = None
+        if after is None:
+            rows = result.all()
+            executions = [row[0] for row in rows]
+            if rows:
+                total = rows[0].total
+            elif offset == 0:
+                total = 0
+        else:
+            executions = result.scalars().all()
+
+        # Past the last page or after a cursor, the rows can't tell the total
+        if total is None:
+            count_result = await session.execute(
+                select(func.count()).select_from(AthenaQueryExecution).filter(*filters)
+            )
+            total = count_result.scalar_one()
+
+        return executions, total
+
+    @staticmethod
+    def _keyset_filter(after: Tuple[datetime, int] | None) -> list:
+        if after is None:
+            return []
+        return [
+            tuple_(AthenaQueryExecution.created_at, AthenaQueryExecution.id)
+            < tuple_(*after)
+        ]
 
     async def get_by_batch_id(
         self, session: AsyncSession, batch_id: str, user_id: int
     ) -> List[AthenaQueryExecution]:
-        """Get a query execution by batch id"""
+        """Get a query execution by batch id with its query"""
+        # The query's subtype names each sheet of the export, joined in the same statement
         result = await session.execute(
             select(AthenaQueryExecution)
-            .options(selectinload(AthenaQueryExecution.query))
+            .options(joinedload(AthenaQueryExecution.query))
             .filter(
                 AthenaQueryExecution.batch_id == batch_id,
                 AthenaQueryExecution.user_id == user_id,
@@ -1,5 +1,7 @@
-from typing import List, Tuple
-from sqlalchemy import select, delete, update
+import logging
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from sqlalchemy import select, delete, update, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from trucost.core.models.resource_owner import (
@@ -12,6 +14,8 @@ from trucost.core.services.base import BaseService
 from trucost.core.models.cost_optimization import CostOptimize
 from trucost.core.models.common.filter import FilterOperator
 
+logger = logging.getLogger(__name__)
+
 
 class ResourceOwnerRepository(BaseService, Filter):
     """Repository for resource owner data retrieval"""
@@ -84,6 +88,59 @@ class ResourceOwnerRepository(BaseService, Filter):
         result = await session.execute(query)
         return result.scalar_one()
 
+    async def assign_many(
+        self,
+        session: AsyncSession,
+        resource_owners: List[ResourceOwnerCreateRequest],
+        owner_name: str,
+        owner_email: str,
+        status: ResourceOwnerStatus,
+    ) -> List[ResourceOwner]:
+        """Update the existing resource owners and create the missing ones in one transaction"""
+        # Load every existing owner of the requested resources with a single query
+        result = await session.execute(
+            select(ResourceOwner).where(
+                ResourceOwner.resource_id.in_(
+                    {ro_item.resource_id for ro_item in resource_owners}
+                )
+            )
+        )
+        existing_by_resource: Dict[str, List[ResourceOwner]] = defaultdict(list)
+        for owner in result.scalars():
+            existing_by_resource[owner.resource_id].append(owner)
+
+        assigned = []
+        for ro_item in resource_owners:
+            existing = existing_by_resource.get(ro_item.resource_id, [])
+            if ro_item.account_id and not any(
+                owner.account_id == ro_item.account_id for owner in existing
+            ):
+                existing = []
+
+            if existing:
+                # Like `update`, every owner of the resource is updated
+                for owner in existing:
+                    owner.account_id = ro_item.account_id
+                    owner.owner_name = owner_name
+                    owner.owner_email = owner_email
+                    owner.status = status
+                assigned.append(existing[0])
+            else:
+                new_owner = ResourceOwner(
+                    resource_id=ro_item.resource_id,
+                    account_id=ro_item.account_id,
+                    owner_name=owner_name,
+                    owner_email=owner_email,
+                    status=status,
+                )
+                session.add(new_owner)
+                existing_by_resource[ro_item.resource_id].append(new_owner)
+                assigned.append(new_owner)
+
+        # The updates and inserts are flushed in batches on the single commit
+        await session.commit()
+        return assigned
+
     async def delete(self, session: AsyncSession, owner_id: int) -> None:
         """Delete a resource owner"""
         query = delete(ResourceOwner).where(ResourceOwner.id == owner_id)
@@ -96,27 +153,47 @@ class ResourceOwnerRepository(BaseService, Filter):
         offset: int = 0,
         limit: int = 100,
         status: ResourceOwnerStatus | None = None,
+        after_id: int | None = None,
     ) -> Tuple[List[ResourceOwner], int]:
-        """List resource owners with pagination and optional status filter"""
-        # Base query
-        query = select(ResourceOwner)
-        count_query = select(ResourceOwner)
-
+        """
+        List resource owners with pagination and optional status filter
+        With `after_id`, the id of the last owner of the previous page, the page starts
+        right after it instead of skipping `offset` rows
+        """
         # Add status filter if provided
-        if status:
-            query = query.where(ResourceOwner.status == status)
-            count_query = count_query.where(ResourceOwner.status == status)
+        filters = [ResourceOwner.status == status] if status else []
 
-        # Add pagination
-        query = query.offset(offset).limit(limit)
+        # Base query, the total is returned with every row of the page
+        query = select(ResourceOwner).where(*filters)
 
-        # Execute queries
+        # Add pagination
+        if after_id is not None:
+            query = query.where(ResourceOwner.id > after_id)
+            offset = 0
+        else:
+            query = query.add_columns(func.count().over().label("total"))
+        query = query.order_by(ResourceOwner.id).offset(offset).limit(limit)
+
+        # Execute query
         result = await session.execute(query)
-        count_result = await session.execute(count_query)
 
-        # Get results
-        owners = result.scalars().all()
-        total = len(count_result.scalars().all())
+        total = None
+        if after_id is None:
+            rows = result.all()
+            owners = [row[0] for row in rows]
+            if rows:
+                total = rows[0].total
+            elif offset == 0:
+                total = 0
+        else:
+            owners = result.scalars().all()
+
+        # Past the last page or after a cursor, the rows can't tell the total
+        if total is None:
+            count_result = await session.execute(
+                select(func.count()).select_from(ResourceOwner).where(*filters)
+            )
+            total = count_result.scalar_one()
 
         return owners, total
 
@@ -139,8 +216,8 @@ class ResourceOwnerRepository(BaseService, Filter):
         override_existing: bool = False,
         filters: List[FilterOperator] | None = None,
     ) -> List[ResourceOwner]:
-        print(f"filters: {filters=}")
         """Assign all resource owners"""
+        logger.debug("Assigning owner to all resources matching %r", filters)
         query = select(CostOptimize, ResourceOwner).outerjoin(
             ResourceOwner,
             ResourceOwner.resource_id == CostOptimize.resource_id,
@@ -149,20 +226,15 @@ class ResourceOwnerRepository(BaseService, Filter):
         if filters:
             query = self.apply_filters([CostOptimize, ResourceOwner], query, filters)
 
-        print(f"query: {query}")
-
         result = await session.execute(query)
         rows = result.all()
 
-        print(f"rows: {len(rows)=}")
-
         # raise Exception("stop here")
         combined_data = []
         for cost_optimization, resource_owner in rows:
             assert isinstance(cost_optimization, CostOptimize)
 
             if resource_owner:
-                print(f"deleting resource_owner: {resource_owner.id}")
                 await self.delete(session, resource_owner.id)
 
             resource_owner = ResourceOwner(
@@ -177,5 +249,5 @@ class ResourceOwnerRepository(BaseService, Filter):
             session.add(resource_owner)
         await session.commit()
 
-        print(f"combined_data: {len(combined_data)=}")
+        logger.debug("Assigned owner to %s resources", len(combined_data))
         return combined_data
@@ -1,3 +1,4 @@
+import logging
 from typing import List, Tuple, Dict
 from sqlalchemy import select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -13,6 +14,8 @@ from trucost.core.models.resource_tagging import (
 )
 from trucost.core.models.resource_owner import ResourceOwner
 
+logger = logging.getLogger(__name__)
+
 
 class ResourceTagMappingRepository(BaseService, Filter):
     """Repository for resource tag mapping data retrieval"""
@@ -36,8 +39,15 @@ class ResourceTagMappingRepository(BaseService, Filter):
         limit: int = 100,
         filters: List[FilterOperator] | None = None,
         sort: List[SortConfig] | None = None,
-    ) -> Tuple[List[ResourceTagMapping], int]:
-        """List resource tag mappings with pagination and optional resource_ids filter"""
+        with_total: bool = True,
+        after_resource_id: str | None = None,
+    ) -> Tuple[List[ResourceTagMapping], int | None]:
+        """
+        List resource tag mappings with pagination and optional resource_ids filter
+        The total count query is skipped when `with_total` is False, the total is then None
+        Without `sort`, rows are ordered by resource id and with `after_resource_id`, the
+        last resource id of the previous page, the page starts right after it
+        """
         # Base query
         query = select(ResourceTagMapping)
 
@@ -46,6 +56,11 @@ class ResourceTagMappingRepository(BaseService, Filter):
 
         if sort:
             query = self.apply_sorting(ResourceTagMapping, query, sort)
+        else:
+            query = query.order_by(ResourceTagMapping.resource_id)
+            if after_resource_id is not None:
+                query = query.where(ResourceTagMapping.resource_id > after_resource_id)
+                offset = 0
 
         # Add pagination
         query = query.offset(offset).limit(limit)
@@ -53,12 +68,16 @@ class ResourceTagMappingRepository(BaseService, Filter):
         # Execute queries
         result = await session.execute(query)
 
-        # Get total count of resource tag mappings with filters
-        total_query = select(func.count()).select_from(ResourceTagMapping)
-        if filters:
-            total_query = self.apply_filters([ResourceTagMapping], total_query, filters)
-        total_result = await session.execute(total_query)
-        total = total_result.scalar_one()
+        total = None
+        if with_total:
+            # Get total count of resource tag mappings with filters, without the sorting
+            total_query = select(func.count()).select_from(ResourceTagMapping)
+            if filters:
+                total_query = self.apply_filters(
+                    [ResourceTagMapping], total_query, filters
+                )
+            total_result = await session.execute(total_query)
+            total = total_result.scalar_one()
 
         # Get results
         mappings = result.scalars().all()
@@ -154,22 +173,20 @@ class ResourceTagMappingRepository(BaseService, Filter):
         update_data: dict,
     ) -> ResourceTagMapping:
         """Update a resource tag mapping"""
-        # First check if the resource exists
-        existing = await self.get_by_resource_id(session, resource_id)
-        if not existing:
-            return None
-
         # Update only user-editable fields
         update_data["last_user_update"] = func.now()
 
-        # Update the resource tag mapping
+        # Update the resource tag mapping, no matched row means it does not exist.
+        # MySQL has no UPDATE ... RETURNING, the row is read back after the commit
         query = (
             update(ResourceTagMapping)
             .where(ResourceTagMapping.resource_id == resource_id)
             .values(**update_data)
         )
-        await session.execute(query)
+        result = await session.execute(query)
         await session.commit()
+        if not result.rowcount:
+            return None
 
         # Fetch the updated record
         return await self.get_by_resource_id(session, resource_id)
@@ -180,7 +197,7 @@ class ResourceTagMappingRepository(BaseService, Filter):
         request: AssignAllResourceTagsRequest,
     ) -> List[ResourceTagMappingResponse]:
         """Assign all resource tags to the user"""
-        print(f"request: {request.model_dump()=}")
+        logger.debug("Assigning tags to all filtered resources: %r", request)
 
         # Build base query with filters
         base_query = select(ResourceTagMapping)
@@ -228,7 +245,7 @@ class ResourceTagMappingRepository(BaseService, Filter):
         request: AssignResourceTagsRequest,
     ) -> List[ResourceTagMappingResponse]:
         """Assign resource tags to the user"""
-        print(f"request: {request.model_dump()=}")
+        logger.debug("Assigning tags to resources: %r", request)
 
         query = (
             update(ResourceTagMapping)
@@ -2,7 +2,7 @@ from typing import List, Optional
 
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
 from trucost.core.models.template import (
     Template,
@@ -212,8 +212,13 @@ class TemplateRepository(BaseService):
         session: AsyncSession,
         offset: int = 0,
         limit: int = 10,
+        after_id: int | None = None,
     ) -> tuple[List[Template], int]:
-        """List all templates."""
+        """
+        List all templates.
+        With `after_id`, the id of the last template of the previous page, the page starts
+        right after it instead of skipping `offset` rows
+        """
 
         count_result = await session.execute(select(func.count()).select_from(Template))
         total = count_result.scalar_one()
@@ -226,10 +231,12 @@ class TemplateRepository(BaseService):
                     QueryTemplateAssignment.query
                 ),
             )
-            .offset(offset)
-            .limit(limit)
+            .order_by(Template.id)
         )
-        result = await session.execute(stmt)
+        if after_id is not None:
+            stmt = stmt.where(Template.id > after_id)
+            offset = 0
+        result = await session.execute(stmt.offset(offset).limit(limit))
         return list(result.scalars().all()), total
 
     async def get_user_templates_queries(
@@ -237,14 +244,16 @@ class TemplateRepository(BaseService):
     ) -> List[QueryTemplateAssignment]:
         """Get all templates with queries."""
 
-        # Get all templates assigned to the user
-        templates = await self.get_templates_by_user(session, user_id)
-        template_ids = [template.id for template in templates]
-
-        # Get all queries assigned to the templates
+        # The queries assigned to the user's templates and the queries themselves are
+        # read in one statement, not the templates first and then an IN lookup
         stmt = (
             select(QueryTemplateAssignment)
-            .where(QueryTemplateAssignment.template_id.in_(template_ids))
-            .options(selectinload(QueryTemplateAssignment.query))
+            .join(
+                UserTemplateAssignment,
+                UserTemplateAssignment.template_id
+                == QueryTemplateAssignment.template_id,
+            )
+            .where(UserTemplateAssignment.user_id == user_id)
+            .options(joinedload(QueryTemplateAssignment.query))
         )
         return list((await session.execute(stmt)).scalars().all())
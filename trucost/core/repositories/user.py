@@ -102,8 +102,8 @@ class UserRepository(BaseService):
             .filter(User.id == user_id)
             .options(
                 selectinload(User.user_settings),
-                selectinload(User.assigned_templates).options(
-                    selectinload(Template.queries_assigned)
+                selectinload(User.assigned_templates).selectinload(
+                    Template.queries_assigned
                 ),
             )
         )
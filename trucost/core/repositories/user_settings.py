@@ -1,4 +1,5 @@
-from sqlalchemy import select, update
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 
@@ -38,53 +39,62 @@ class UserSettingsRepository(BaseService):
 
     async def create(
         self, session: AsyncSession, user_settings: UserSettingsCreate
-    ) -> UserSettings:
-        """Create a new user settings"""
-        user_settings = UserSettings(**user_settings.model_dump())
-        session.add(user_settings)
+    ) -> UserSettings | None:
+        """
+        Create a new user settings, None when the user already has settings with the name.
+        A single INSERT ... ON CONFLICT DO NOTHING RETURNING, no lookup by name first
+        """
+        result = await session.scalars(
+            pg_insert(UserSettings)
+            .values(**user_settings.model_dump())
+            .on_conflict_do_nothing(constraint="uix_user_settings_name_user_id")
+            .returning(UserSettings)
+        )
+        settings = result.one_or_none()
         await session.commit()
-        await session.refresh(user_settings)
-        return user_settings
+        return settings
 
     async def update(
         self,
         session: AsyncSession,
         settings_id: int,
+        user_id: int,
         settings_update: UserSettingsUpdate,
-    ) -> UserSettings:
+    ) -> UserSettings | None:
         """
-        Update user settings
+        Update user settings, None when the user has no settings with the id
         """
+        # Update only the fields that are provided
+        update_data = settings_update.model_dump(exclude_unset=True, exclude={"id"})
+        if "active" in update_data:
+            # if already active, don't update
+            update_data["active"] = case(
+                (UserSettings.active, True), else_=update_data["active"]
+            )
 
-        result = await session.execute(
-            select(UserSettings).filter(UserSettings.id == settings_id)
+        result = await session.scalars(
+            update(UserSettings)
+            .filter(UserSettings.id == settings_id, UserSettings.user_id == user_id)
+            .values(**update_data)
+            .returning(UserSettings)
         )
-        settings = result.scalar_one_or_none()
+        settings = result.one_or_none()
         if not settings:
+            await session.rollback()
             return None
 
-        # Update only the fields that are provided
-        update_data = settings_update.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            # if already active, don't update
-            if field == "active" and settings.active:
-                continue
-
-            setattr(settings, field, value)
-
         if settings_update.active:
             # Update all other settings to inactive
             await session.execute(
                 update(UserSettings)
                 .filter(
-                    UserSettings.user_id == settings.user_id,
+                    UserSettings.user_id == user_id,
                     UserSettings.id != settings.id,
                 )
                 .values(active=False)
             )
 
         await session.commit()
-        await session.refresh(settings)
         return settings
 
     async def list_paginated(
@@ -112,15 +122,15 @@ class UserSettingsRepository(BaseService):
         )
         return result.scalars().all(), total
 
-    async def delete(self, session: AsyncSession, settings_id: int) -> UserSettings:
-        """Delete a user settings"""
-        result = await session.execute(
-            select(UserSettings).filter(UserSettings.id == settings_id)
+    async def delete(
+        self, session: AsyncSession, settings_id: int, user_id: int
+    ) -> UserSettings | None:
+        """Delete a user settings, None when the user has no settings with the id"""
+        result = await session.scalars(
+            delete(UserSettings)
+            .filter(UserSettings.id == settings_id, UserSettings.user_id == user_id)
+            .returning(UserSettings)
         )
-        settings = result.scalar_one_or_none()
-        if not settings:
-            return None
-
-        await session.delete(settings)
+        settings = result.one_or_none()
         await session.commit()
         return settings
@@ -1,15 +1,34 @@
 import asyncio
-import time
+import logging
 from typing import TYPE_CHECKING, Any, Dict, Tuple
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError, BotoCoreError
+from cachetools import LRUCache
 
 from trucost.core.services.base import BaseService
 
 if TYPE_CHECKING:
     from trucost.core.settings import MetaSettings, Metaservices
 
+logger = logging.getLogger(__name__)
+
+# Built once, clients created from it share the loaded service models and endpoint data
+# instead of each going through a fresh botocore session
+_SESSION = boto3.session.Session()
+
+# Shared by every athena client, the connection pool is kept large enough for the
+# batch endpoints and connections stay alive between the requests reusing a client
+_CLIENT_CONFIG = Config(
+    max_pool_connections=64,
+    tcp_keepalive=True,
+    retries={"max_attempts": 5, "mode": "adaptive"},
+)
+
+# Most ids BatchGetQueryExecution accepts per call
+_BATCH_GET_LIMIT = 50
+
 
 class AthenaSqlExecutorService:
     """
@@ -24,14 +43,16 @@ class AthenaSqlExecutorService:
         aws_session_token: str | None = None,
         endpoint_url: str | None = None,
     ):
-        self._client = boto3.client(
+        self._client = _SESSION.client(
             "athena",
             region_name=region_name,
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key,
             aws_session_token=aws_session_token,
             endpoint_url=endpoint_url,
+            config=_CLIENT_CONFIG,
         )
+        self._inflight_results: Dict[str, asyncio.Future] = {}
 
     def sync_validate_connection(self):
         try:
@@ -68,8 +89,11 @@ class AthenaSqlExecutorService:
                     ",".join(f"'{month}'" for month in query_metadata["months"]),
                 )
             )
-            print(
-                f"Query: {query}, Database: {database}, Output Location: {output_location}"
+            logger.debug(
+                "Query: %s, Database: %s, Output Location: %s",
+                query,
+                database,
+                output_location,
             )
 
             query_excutor = self._client.start_query_execution(
@@ -123,37 +147,35 @@ class AthenaSqlExecutorService:
             self.sync_get_query_execution_status, query_execution_id
         )
 
-    def sync_poll_query_execution(
+    def sync_get_query_execution_statuses(
         self,
-        query_execution_id: str,
-        interval: int = 1,
-        max_attempts: int = 10,
-    ) -> list[dict[str, Any]]:
+        query_execution_ids: list[str],
+    ) -> dict[str, dict[str, str | None]]:
         """
-        Poll the status of a query execution.
-        # Step 2: Wait for Query to Complete
+        Get the status of many query executions, 50 per call.
         """
-
+        statuses = {}
         try:
-            attempts = 0
-            while True:
-                status = self.sync_get_query_execution_status(query_execution_id)
-                if status in ["SUCCEEDED", "FAILED", "CANCELLED"]:
-                    return status
-                else:
-                    print("Waiting for query to complete...")
-                    time.sleep(interval)
-                    attempts += 1
-                    if attempts >= max_attempts:
-                        raise RuntimeError("Query execution timed out")
+            for i in range(0, len(query_execution_ids), _BATCH_GET_LIMIT):
+                response = self._client.batch_get_query_execution(
+                    QueryExecutionIds=query_execution_ids[i : i + _BATCH_GET_LIMIT]
+                )
+                for execution in response["QueryExecutions"]:
+                    statuses[execution["QueryExecutionId"]] = {
+                        "status": execution["Status"]["State"],
+                        "failure_reason": execution["Status"].get(
+                            "StateChangeReason", None
+                        ),
+                    }
+            return statuses
         except Exception as e:
             raise RuntimeError(f"Athena BotoCoreError: {e}")
 
-    async def poll_query_execution(
-        self, query_execution_id: str, interval: int = 1, max_attempts: int = 10
-    ) -> list[dict[str, Any]]:
+    async def get_query_execution_statuses(
+        self, query_execution_ids: list[str]
+    ) -> dict[str, dict[str, str | None]]:
         return await asyncio.to_thread(
-            self.sync_poll_query_execution, query_execution_id, interval, max_attempts
+            self.sync_get_query_execution_statuses, query_execution_ids
         )
 
     def sync_get_query_results(
@@ -179,7 +201,19 @@ class AthenaSqlExecutorService:
             raise RuntimeError(f"Athena BotoCoreError: {e}")
 
     async def get_query_results(self, query_execution_id: str) -> list[dict[str, Any]]:
-        return await asyncio.to_thread(self.sync_get_query_results, query_execution_id)
+        # Concurrent requests for the same results share a single GetQueryResults call
+        task = self._inflight_results.get(query_execution_id)
+        if task is None:
+            task = asyncio.ensure_future(
+                asyncio.to_thread(self.sync_get_query_results, query_execution_id)
+            )
+            self._inflight_results[query_execution_id] = task
+            task.add_done_callback(
+                lambda _: self._inflight_results.pop(query_execution_id, None)
+            )
+
+        # A caller going away doesn't cancel the call the others are waiting on
+        return await asyncio.shield(task)
 
 
 class AthenaSqlExecutorServiceFactory(BaseService):
@@ -187,7 +221,10 @@ class AthenaSqlExecutorServiceFactory(BaseService):
     Factory for AthenaSqlExecutorService.
     """
 
-    _clients: Dict[Tuple[str, str, str, str, str], Any] = {}
+    # Long lived clients per credentials, the least recently used are dropped first
+    _clients: Dict[Tuple[str, str, str, str, str], Any] = LRUCache(maxsize=128)
+    # Concurrent requests for new credentials validate and build the client only once
+    _clients_lock = asyncio.Lock()
 
     @classmethod
     async def get_client(
@@ -204,23 +241,29 @@ class AthenaSqlExecutorServiceFactory(BaseService):
             aws_session_token,
         )
 
-        if key not in cls._clients:
-            await cls.validate_connection(
-                region_name=region_name,
-                aws_access_key_id=aws_access_key_id,
-                aws_secret_access_key=aws_secret_access_key,
-                aws_session_token=aws_session_token,
-            )
+        client = cls._clients.get(key)
+        if client is not None:
+            return client
 
-            cls._clients[key] = AthenaSqlExecutorService(
-                region_name=region_name,
-                aws_access_key_id=aws_access_key_id,
-                aws_secret_access_key=aws_secret_access_key,
-                aws_session_token=aws_session_token,
-                endpoint_url=None,
-            )
+        async with cls._clients_lock:
+            client = cls._clients.get(key)
+            if client is None:
+                await cls.validate_connection(
+                    region_name=region_name,
+                    aws_access_key_id=aws_access_key_id,
+                    aws_secret_access_key=aws_secret_access_key,
+                    aws_session_token=aws_session_token,
+                )
+
+                client = cls._clients[key] = AthenaSqlExecutorService(
+                    region_name=region_name,
+                    aws_access_key_id=aws_access_key_id,
+                    aws_secret_access_key=aws_secret_access_key,
+                    aws_session_token=aws_session_token,
+                    endpoint_url=None,
+                )
 
-        return cls._clients[key]
+        return client
 
     @classmethod
     async def validate_connection(
@@ -230,12 +273,13 @@ class AthenaSqlExecutorServiceFactory(BaseService):
         aws_secret_access_key: str,
         aws_session_token: str | None = None,
     ):
-        session = boto3.client(
+        session = _SESSION.client(
             "sts",
             region_name=region_name,
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key,
             aws_session_token=aws_session_token,
+            config=_CLIENT_CONFIG,
         )
         try:
             await asyncio.to_thread(session.get_caller_identity)
@@ -243,7 +287,7 @@ class AthenaSqlExecutorServiceFactory(BaseService):
             raise Exception(f"Athena BotoCoreError: {e}")
 
     async def connect(self, settings: "MetaSettings", services: "Metaservices"):
-        self._clients = {}
+        self._clients.clear()
 
     async def disconnect(self, settings: "MetaSettings"):
-        self._clients = {}
+        self._clients.clear()
@@ -16,9 +16,8 @@ if TYPE_CHECKING:
 def get_secret_hash(username, client_id, client_secret):
     message = bytes(username + client_id, "utf-8")
     key = bytes(client_secret, "utf-8")
-    return base64.b64encode(
-        hmac.new(key, message, digestmod=hashlib.sha256).digest()
-    ).decode()
+    # single-shot C implementation, no Python level HMAC object
+    return base64.b64encode(hmac.digest(key, message, hashlib.sha256)).decode()
 
 
 class CognitoService(BaseService):
@@ -1,13 +1,16 @@
 import asyncio
 from enum import Enum
+from functools import lru_cache
 from typing import AsyncGenerator, TYPE_CHECKING
 from contextlib import asynccontextmanager
 from concurrent.futures import ProcessPoolExecutor
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import text
+from sqlalchemy import Connection, inspect, text
 
+from trucost.core.models.cost_optimization import CostOptimize
 from trucost.core.services.base import BaseService
 from trucost.utilities.db_migration import run_migrations
 
@@ -15,13 +18,47 @@ if TYPE_CHECKING:
     from trucost.core.settings import MetaSettings, Metaservices
 
 
+@lru_cache(maxsize=10_000)
 def domain_from_email(email: str) -> str:
-    domain = email.split("@")[1].strip().lower()
+    at = email.find("@")
+    if at < 0:
+        raise ValueError(f"Invalid email: {email=}")
+    domain = email[at + 1 :].strip().lower()
     if not domain:
         raise ValueError(f"Invalid domain: {domain=}")
     return domain
 
 
+# Summary tables created by the summary loads rather than the migrations, their declared
+# indexes are created once the table exists
+_LOADED_TABLES = (CostOptimize.__table__,)
+
+
+def ensure_loaded_table_indexes(conn: Connection) -> bool:
+    """
+    Create the declared indexes missing on the loaded summary tables.
+    Returns False while a table is not loaded yet, its indexes are then still missing.
+    """
+    inspector = inspect(conn)
+    loaded = True
+    for table in _LOADED_TABLES:
+        if not inspector.has_table(table.name):
+            loaded = False
+            continue
+
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                index.create(conn)
+            except OperationalError as e:
+                # Created by a concurrent request in the meantime
+                if "(1061," not in str(e):
+                    raise
+    return loaded
+
+
 class AvailableDB(str, Enum):
     POSTGRES = "postgresql"
     MYSQL = "mysql"
@@ -32,9 +69,24 @@ class DBService(BaseService):
     Service for database operations.
     """
 
-    def __init__(self, db_type: AvailableDB, db_name: str | None = None):
+    # QueuePool settings shared by every engine, stale RDS connections are
+    # pinged out and recycled before they can fail a real query
+    pool_kwargs = {
+        "pool_size": 20,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 30 * 60,  # 30 minutes
+        "pool_pre_ping": True,
+    }
+    # Compiled statements are cached per engine, kept larger than the default 500 so
+    # the filter and sort variants of the list queries are not evicted by each other
+    query_cache_size = 1200
+
+    def __init__(self, db_type: AvailableDB, db_name: str | None = None, **pool_kwargs):
         self.db_type = db_type
         self.db_name = db_name
+        # Per engine overrides of the shared pool settings
+        self.pool_kwargs = {**self.pool_kwargs, **pool_kwargs}
 
         self._engine: AsyncEngine | None = None
         self._session: AsyncSession | None = None
@@ -43,11 +95,17 @@ class DBService(BaseService):
         try:
             if self.db_type == AvailableDB.POSTGRES:
                 print(f"[+] Connecting to {settings.db_dsn=}")
-                self._engine = create_async_engine(settings.db_dsn)
+                self._engine = create_async_engine(
+                    settings.db_dsn,
+                    query_cache_size=self.query_cache_size,
+                    **self.pool_kwargs,
+                )
             elif self.db_type == AvailableDB.MYSQL:
                 print(f"[+] Connecting to {settings.summary_db_dsn(self.db_name)=}")
                 self._engine = create_async_engine(
-                    settings.summary_db_dsn(self.db_name)
+                    settings.summary_db_dsn(self.db_name),
+                    query_cache_size=self.query_cache_size,
+                    **self.pool_kwargs,
                 )
             else:
                 raise ValueError(f"Invalid database type: {self.db_type}")
@@ -71,6 +129,11 @@ class DBService(BaseService):
         async with self._session() as session:
             yield session
 
+    async def run_sync(self, fn):
+        """Run `fn` with a sync connection, in a transaction"""
+        async with self._engine.begin() as conn:
+            return await conn.run_sync(fn)
+
     async def close(self):
         await self._engine.dispose()
 
@@ -81,6 +144,13 @@ class SummaryDBFactory(BaseService):
     """
 
     _db_services: dict[str, DBService] = {}
+    _db_services_lock = asyncio.Lock()
+    # Databases whose loaded tables have all their indexes
+    _indexed_db_names: set[str] = set()
+
+    # One engine is kept per summary database, their pools are kept smaller than the
+    # main database's so the connections stay bounded as accounts are added
+    pool_kwargs = {"pool_size": 5, "max_overflow": 10}
 
     @asynccontextmanager
     async def get_session(
@@ -92,16 +162,31 @@ class SummaryDBFactory(BaseService):
         if settings.use_central_db:
             db_name = settings.summary_db_name_prefix
 
-        if db_name not in self._db_services:
-            self._db_services[db_name] = DBService(AvailableDB.MYSQL, db_name)
-            await self._db_services[db_name].connect(settings, services)
+        db_service = self._db_services.get(db_name)
+        if db_service is None:
+            # Concurrent first requests for an account share the one engine, it is
+            # only kept once connected so a failed connect is retried next time
+            async with self._db_services_lock:
+                db_service = self._db_services.get(db_name)
+                if db_service is None:
+                    db_service = DBService(
+                        AvailableDB.MYSQL, db_name, **self.pool_kwargs
+                    )
+                    await db_service.connect(settings, services)
+                    self._db_services[db_name] = db_service
+
+        # Checked until the summary load has created the tables, then never again
+        if db_name not in self._indexed_db_names:
+            if await db_service.run_sync(ensure_loaded_table_indexes):
+                self._indexed_db_names.add(db_name)
 
-        async with self._db_services[db_name].get_session() as session:
+        async with db_service.get_session() as session:
             yield session
 
     async def close(self, db_name: str):
         await self._db_services[db_name].close()
         del self._db_services[db_name]
+        self._indexed_db_names.discard(db_name)
 
     async def create_db(
         self,
@@ -154,3 +239,5 @@ class SummaryDBFactory(BaseService):
     async def disconnect(self, settings: "MetaSettings"):
         for db_service in self._db_services.values():
             await db_service.close()
+        self._db_services.clear()
+        self._indexed_db_names.clear()
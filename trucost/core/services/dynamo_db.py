@@ -1,18 +1,28 @@
 import asyncio
+import logging
 from typing import Any, Dict, List, Optional, AsyncGenerator
 
 
+from cachetools import TTLCache
+
 import boto3
 from botocore.exceptions import ClientError, BotoCoreError
 
 from trucost.core.services.base import BaseService
 
+logger = logging.getLogger(__name__)
+
 
 class DynamoDBService(BaseService):
     """
     Service for DynamoDB operations with basic caching for read operations.
     """
 
+    # (table_name, domain_name) -> account_id
+    _account_id_cache = TTLCache(maxsize=10_000, ttl=5 * 60)  # 5 minutes
+    # Domains without an account are re-checked sooner so new ones show up quickly
+    _missing_account_id_cache = TTLCache(maxsize=10_000, ttl=30)  # 30 seconds
+
     def __init__(
         self,
         region_name: str,
@@ -341,6 +351,12 @@ class DynamoDBService(BaseService):
         Returns:
             The account ID if found, None otherwise
         """
+        cache_key = (table_name, domain_name)
+        if cache_key in self._account_id_cache:
+            return self._account_id_cache[cache_key]
+        if cache_key in self._missing_account_id_cache:
+            return None
+
         try:
             items = await self.scan(
                 table_name=table_name,
@@ -350,12 +366,15 @@ class DynamoDBService(BaseService):
             )
 
             # Return the first matching account ID if found
-            if items:
-                return items[0].get("accountid", {}).get("S")
-            return None
-
-        except (ClientError, BotoCoreError) as e:
-            print(f"Error getting account ID for domain {domain_name}: {str(e)}")
+            account_id = items[0].get("accountid", {}).get("S") if items else None
+            if account_id:
+                self._account_id_cache[cache_key] = account_id
+            else:
+                self._missing_account_id_cache[cache_key] = True
+            return account_id
+
+        except (ClientError, BotoCoreError):
+            logger.exception("Error getting account ID for domain %s", domain_name)
             raise
 
     async def get_all_records(
@@ -1,9 +1,23 @@
-from typing import List, Any, Dict
+import operator
+from typing import List, Any, Callable, Dict
 
 from sqlalchemy import func, and_, or_, asc, desc, Select
 
 from trucost.core.models.common.filter import FilterOperator, GroupByConfig, SortConfig
 
+# Condition builder per filter operator, the operators are validated by FilterOperator
+_OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "lt": operator.lt,
+    "gte": operator.ge,
+    "lte": operator.le,
+    "in": lambda column, value: column.in_(value),
+    "like": lambda column, value: column.like(f"%{value}%"),
+    "is": lambda column, value: column.is_(value),
+}
+
 
 class Filter:
     def apply_filters(
@@ -27,27 +41,10 @@ class Filter:
                 if column is not None:
                     break
 
-            field_conditions = []
-
-            for filter_op in field_filters:
-                if filter_op.operator == "eq":
-                    field_conditions.append(column == filter_op.value)
-                elif filter_op.operator == "ne":
-                    field_conditions.append(column != filter_op.value)
-                elif filter_op.operator == "gt":
-                    field_conditions.append(column > filter_op.value)
-                elif filter_op.operator == "lt":
-                    field_conditions.append(column < filter_op.value)
-                elif filter_op.operator == "gte":
-                    field_conditions.append(column >= filter_op.value)
-                elif filter_op.operator == "lte":
-                    field_conditions.append(column <= filter_op.value)
-                elif filter_op.operator == "in":
-                    field_conditions.append(column.in_(filter_op.value))
-                elif filter_op.operator == "like":
-                    field_conditions.append(column.like(f"%{filter_op.value}%"))
-                elif filter_op.operator == "is":
-                    field_conditions.append(column.is_(filter_op.value))
+            field_conditions = [
+                _OPERATORS[filter_op.operator](column, filter_op.value)
+                for filter_op in field_filters
+            ]
 
             # Combine conditions for the same field with OR
             if field_conditions:
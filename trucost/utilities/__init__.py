@@ -1,3 +1,3 @@
-from .result_to_excel import result_to_excel
+from .result_to_excel import result_to_excel, result_to_excel_path
 
-__all__ = ["result_to_excel"]
+__all__ = ["result_to_excel", "result_to_excel_path"]
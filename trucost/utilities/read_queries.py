@@ -1,36 +1,59 @@
+import asyncio
 import csv
-from typing import List
+import logging
+from concurrent.futures import Executor
+from itertools import islice
+from typing import AsyncIterator, Iterator, List
 import io
 
 import openpyxl
 
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.datastructures import UploadFile
 
 from trucost.core.models.athena_query import AthenaQueryCreate
 
+logger = logging.getLogger(__name__)
 
-async def parse_csv_file(file: UploadFile) -> List[AthenaQueryCreate]:
-    queries = []
+# CSV rows read, decoded and validated per threadpool call
+_CSV_ROWS_PER_READ = 1000
+
+
+async def parse_csv_file(file: UploadFile) -> AsyncIterator[AthenaQueryCreate]:
+    """
+    Lazily parse the uploaded CSV file, a block of rows at a time
+    The upload may have been spilled to disk, the blocks are read, decoded and validated
+    in the threadpool instead of on the event loop
+    """
+    rows = _iter_csv_file(file)
     try:
-        content = await file.read()
+        while batch := await run_in_threadpool(list, islice(rows, _CSV_ROWS_PER_READ)):
+            for athena_query in batch:
+                yield athena_query
+    finally:
+        rows.close()
+
 
-        # Use StringIO to handle newlines properly
-        csv_file = io.StringIO(content.decode("utf-8"))
-        reader = csv.DictReader(csv_file)
-        for row in reader:
-            queries.append(AthenaQueryCreate(**row))
+def _iter_csv_file(file: UploadFile) -> Iterator[AthenaQueryCreate]:
+    # Decode the spooled upload in place instead of reading it all in memory,
+    # newline="" lets the csv module handle quoted newlines
+    csv_file = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        for row in csv.DictReader(csv_file):
+            yield AthenaQueryCreate(**row)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error parsing CSV file: {str(e)}")
     finally:
-        await file.seek(0)
-    return queries
+        # Keep the underlying upload file open
+        csv_file.detach()
+        file.file.seek(0)
 
 
-def parse_excel_file(
-    file: UploadFile, sheet_name: str | None = None
+def parse_excel_content(
+    content: bytes, sheet_name: str | None = None
 ) -> List[AthenaQueryCreate]:
-    """Parse an Excel file and return a list of AthenaQueryCreate objects"""
+    """Parse the content of an Excel file and return a list of AthenaQueryCreate objects"""
 
     COL_DB_ATTR_MAP = {
         "Master Category": "category",
@@ -41,30 +64,40 @@ def parse_excel_file(
     }
 
     queries = []
-    try:
-        content = file.file.read()
-
-        # Use BytesIO to handle newlines properly
-        workbook = openpyxl.load_workbook(io.BytesIO(content))
-        sheet = workbook.active if sheet_name is None else workbook[sheet_name]
-
-        idx_col_map = {i: col.value for i, col in enumerate(sheet["1"])}
-        for row in sheet.iter_rows(min_row=2, max_row=sheet.max_row, values_only=True):
-            queries.append(
-                AthenaQueryCreate(
-                    **{
-                        COL_DB_ATTR_MAP[idx_col_map[i]]: v
-                        for i, v in enumerate(row)
-                        if i in idx_col_map
-                    }
-                )
+
+    # Use BytesIO to handle newlines properly
+    workbook = openpyxl.load_workbook(io.BytesIO(content))
+    sheet = workbook.active if sheet_name is None else workbook[sheet_name]
+
+    idx_col_map = {i: col.value for i, col in enumerate(sheet["1"])}
+    for row in sheet.iter_rows(min_row=2, max_row=sheet.max_row, values_only=True):
+        queries.append(
+            AthenaQueryCreate(
+                **{
+                    COL_DB_ATTR_MAP[idx_col_map[i]]: v
+                    for i, v in enumerate(row)
+                    if i in idx_col_map
+                }
             )
-    except Exception as e:
-        print(f"Error parsing Excel file: {str(e)}")
-        import traceback
+        )
+    return queries
 
-        traceback.print_exc()
+
+async def parse_excel_file(
+    file: UploadFile, process_pool: Executor, sheet_name: str | None = None
+) -> List[AthenaQueryCreate]:
+    """Parse an Excel file in a worker process and return a list of AthenaQueryCreate objects"""
+    # Excel parsing is CPU bound pure python, run it outside of the event loop's process
+    try:
+        # Only the bytes are sent to the worker, the upload file is not picklable
+        content = await file.read()
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            process_pool, parse_excel_content, content, sheet_name
+        )
+    except Exception as e:
+        logger.exception("Error parsing Excel file")
         raise HTTPException(
             status_code=400, detail=f"Error parsing Excel file: {str(e)}"
         )
-    return queries
@@ -1,9 +1,11 @@
 from io import BytesIO
+from tempfile import NamedTemporaryFile
+from typing import IO
 
 from openpyxl import load_workbook
 
 
-def result_to_excel(template_file: str, sheet_to_result_map: dict) -> bytes:
+def _save_results(template_file: str, sheet_to_result_map: dict, output: IO[bytes]):
     wb = load_workbook(template_file)
 
     for sheet_name, data in sheet_to_result_map.items():
@@ -11,9 +13,22 @@ def result_to_excel(template_file: str, sheet_to_result_map: dict) -> bytes:
         for row in data:
             sheet.append(row)
 
-    output = BytesIO()
     wb.save(output)
-    output.seek(0)
+
+
+def result_to_excel_path(template_file: str, sheet_to_result_map: dict) -> str:
+    """
+    Write the results into the template and save it to a temporary file, only the path
+    is returned so it can run in a worker process. The caller removes the file
+    """
+    with NamedTemporaryFile(suffix=".xlsx", delete=False) as output:
+        _save_results(template_file, sheet_to_result_map, output)
+    return output.name
+
+
+def result_to_excel(template_file: str, sheet_to_result_map: dict) -> bytes:
+    output = BytesIO()
+    _save_results(template_file, sheet_to_result_map, output)
     return output.getvalue()
 
 